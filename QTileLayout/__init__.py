@@ -1 +1,3 @@
+from .gridModel import GridModel
 from .tileLayout import QTileLayout
+from .tileRecord import TileRecord
@@ -0,0 +1,78 @@
+from PyQt5.QtCore import QMimeData, QByteArray
+import json
+
+
+class DragSession:
+    """
+    The tile being dragged: the layouts of the process read it directly instead of parsing the mime data
+    """
+
+    def __init__(self, layoutId, fromRow, fromColumn, rowSpan, columnSpan, rowOffset, columnOffset, widget=None,
+                 group=None):
+        self.layoutId = layoutId
+        self.fromRow = fromRow
+        self.fromColumn = fromColumn
+        self.rowSpan = rowSpan
+        self.columnSpan = columnSpan
+        self.rowOffset = rowOffset
+        self.columnOffset = columnOffset
+        self.widget = widget
+        # the selected widgets dragged together, they stay in their layout until the drop
+        self.group = group
+
+    def toJson(self):
+        """returns the session as json, for the drags leaving the process"""
+        data = {
+            'id': self.layoutId,
+            'from_row': self.fromRow,
+            'from_column': self.fromColumn,
+            'row_span': self.rowSpan,
+            'column_span': self.columnSpan,
+            'row_offset': self.rowOffset,
+            'column_offset': self.columnOffset,
+        }
+        return json.dumps(data).encode()
+
+    @staticmethod
+    def fromMimeData(mimeData):
+        """returns the session carried by the mime data, or None if there is none"""
+        if isinstance(mimeData, TileMimeData):
+            return mimeData.session
+
+        try:
+            data = json.loads(mimeData.data('TileData').data())
+            return DragSession(
+                data['id'],
+                data['from_row'],
+                data['from_column'],
+                data['row_span'],
+                data['column_span'],
+                data['row_offset'],
+                data['column_offset'],
+            )
+        except (ValueError, TypeError, KeyError):
+            return None
+
+
+class TileMimeData(QMimeData):
+    """
+    The mime data of a tile drag: the json payload is only built if it is asked for
+    """
+
+    def __init__(self, session, *args, **kwargs):
+        super(TileMimeData, self).__init__(*args, **kwargs)
+        self.session = session
+
+    def formats(self):
+        """returns the formats of the data"""
+        return ['TileData'] + super().formats()
+
+    def hasFormat(self, mimeType):
+        """returns True if the data can be given in the mimeType format"""
+        return mimeType == 'TileData' or super().hasFormat(mimeType)
+
+    def retrieveData(self, mimeType, preferredType):
+        """builds the json payload when another process asks for it"""
+        if mimeType == 'TileData':
+            return QByteArray(self.session.toJson())
+        return super().retrieveData(mimeType, preferredType)
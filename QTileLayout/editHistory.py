@@ -0,0 +1,54 @@
+from collections import deque
+
+
+class EditHistory:
+    """
+    The last edits of a tileLayout, to undo and redo them: an edit only keeps the widgets it moved or resized, each
+    one as (widget, fromLayoutId, fromArea, toLayoutId, toArea), and the oldest edits are forgotten beyond the depth
+    """
+
+    def __init__(self, depth=100):
+        self.undoStack = deque(maxlen=depth)
+        self.redoStack = deque(maxlen=depth)
+
+    def __len__(self):
+        return len(self.undoStack)
+
+    def record(self, edit):
+        """adds a new edit, the undone ones can not be redone anymore"""
+        self.undoStack.append(edit)
+        self.redoStack.clear()
+
+    def canUndo(self):
+        """returns True if there is an edit to undo"""
+        return bool(self.undoStack)
+
+    def canRedo(self):
+        """returns True if there is an undone edit to redo"""
+        return bool(self.redoStack)
+
+    def popUndo(self):
+        """returns the last edit, it goes to the redo stack once it is undone"""
+        return self.undoStack.pop()
+
+    def popRedo(self):
+        """returns the last undone edit, it goes back to the undo stack once it is redone"""
+        return self.redoStack.pop()
+
+    def pushUndo(self, edit):
+        """puts back a redone edit, the redo stack is kept"""
+        self.undoStack.append(edit)
+
+    def pushRedo(self, edit):
+        """puts an undone edit on the redo stack"""
+        self.redoStack.append(edit)
+
+    def setDepth(self, depth):
+        """changes the number of edits kept, the most recent ones are kept"""
+        self.undoStack = deque(self.undoStack, maxlen=depth)
+        self.redoStack = deque(self.redoStack, maxlen=depth)
+
+    def clear(self):
+        """forgets all the edits"""
+        self.undoStack.clear()
+        self.redoStack.clear()
@@ -0,0 +1,338 @@
+from .occupancyIndex import OccupancyIndex
+from .tileMap import TileMap
+from .tileRecord import TileRecord
+
+
+class GridModel:
+    """
+    The geometry of a tileLayout without Qt: the tile covering each cell, the filled cells and where the tiles go
+    when they are placed, resized or rearranged. A tile is any object with fromRow, fromColumn, rowSpan and columnSpan
+    attributes, the layout uses its Tile widgets and a TileRecord is enough anywhere else
+    """
+
+    def __init__(self, rowNumber, columnNumber):
+        self.rowNumber = rowNumber
+        self.columnNumber = columnNumber
+        self.unboundedRows = False
+        self.occupancyIndex = OccupancyIndex(rowNumber, columnNumber)
+        self.tileMap = TileMap(rowNumber, columnNumber)
+        self.tiles = {}
+
+    def __contains__(self, tile):
+        return tile in self.tiles
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def copy(self):
+        """returns an independent copy made of TileRecords whose keys are the tiles they stand for, it can be used
+        in another thread"""
+        gridModel = GridModel(self.rowNumber, self.columnNumber)
+        gridModel.setUnboundedRows(self.unboundedRows)
+        for tile in self.tiles:
+            key = tile.key if isinstance(tile, TileRecord) else tile
+            gridModel.place(TileRecord(tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan, key))
+        return gridModel
+
+    def clear(self):
+        """takes all the tiles out of the grid"""
+        self.occupancyIndex = OccupancyIndex(self.rowNumber, self.columnNumber)
+        self.occupancyIndex.unboundedRows = self.unboundedRows
+        self.tileMap = TileMap(self.rowNumber, self.columnNumber)
+        self.tiles = {}
+
+    def setUnboundedRows(self, value):
+        """lets the tiles go past the last row, the rows are then added as needed"""
+        self.unboundedRows = value
+        self.occupancyIndex.unboundedRows = value
+
+    def tileAt(self, row, column):
+        """returns the tile covering the cell (row, column), or None if the cell is empty"""
+        return self.tileMap[row][column]
+
+    def isAreaEmpty(self, fromRow, fromColumn, rowSpan, columnSpan):
+        """checks if the area is inside the grid and has no filled cell"""
+        return (
+            self.occupancyIndex.isAreaInside(fromRow, fromColumn, rowSpan, columnSpan)
+            and self.occupancyIndex.isAreaEmpty(fromRow, fromColumn, rowSpan, columnSpan)
+        )
+
+    def place(self, tile):
+        """puts the tile in the grid, its area must have been checked"""
+        self.growRows(tile.fromRow + tile.rowSpan)
+        self.tileMap.fill(tile, tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan)
+        self.occupancyIndex.fill(tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan)
+        self.tiles[tile] = None
+
+    def remove(self, tile):
+        """takes the tile out of the grid"""
+        self.tileMap.fill(None, tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan)
+        self.occupancyIndex.free(tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan)
+        del self.tiles[tile]
+
+    def getTilesInArea(self, fromRow, fromColumn, rowSpan, columnSpan):
+        """returns the distinct tiles intersecting the area, the smallest of the area and the tiles is walked"""
+        fromRow, fromColumn = max(fromRow, 0), max(fromColumn, 0)
+        toRow, toColumn = min(fromRow + rowSpan, self.rowNumber), min(fromColumn + columnSpan, self.columnNumber)
+        if (toRow - fromRow) * (toColumn - fromColumn) >= len(self.tiles):
+            return [
+                tile for tile in self.tiles
+                if tile.fromRow < toRow and fromRow < tile.fromRow + tile.rowSpan
+                and tile.fromColumn < toColumn and fromColumn < tile.fromColumn + tile.columnSpan
+            ]
+        # merged tiles cover several cells, they are listed once
+        return list(dict.fromkeys(
+            self.tileMap[row][column]
+            for row in range(fromRow, toRow)
+            for column in range(fromColumn, toColumn)
+            if self.tileMap[row][column] is not None
+        ))
+
+    def getResizePlan(self, direction, fromRow, fromColumn, tileNumber):
+        """returns the cells merged with or split from the tile at (fromRow, fromColumn) when it is resized by
+        tileNumber cells in the direction (dirX, dirY), True if it grows, and its new area"""
+        tile = self.tileMap[fromRow][fromColumn]
+        rowSpan = tile.rowSpan
+        columnSpan = tile.columnSpan
+        (dirX, dirY) = direction
+
+        if tileNumber * (dirX + dirY) > 0:
+            tileNumber, cells = self.__getCellsToMerge(tile, direction, fromRow, fromColumn, tileNumber)
+            increase = True
+        else:
+            tileNumber, cells = self.__getCellsToSplit(tile, direction, fromRow, fromColumn, tileNumber)
+            increase = False
+
+        columnSpan += tileNumber * dirX
+        fromColumn += tileNumber * (dirX == -1)
+        rowSpan += tileNumber * dirY
+        fromRow += tileNumber * (dirY == -1)
+
+        return cells, increase, (fromRow, fromColumn, rowSpan, columnSpan)
+
+    def merge(self, tile, area, cells):
+        """grows the tile to the area over the given empty cells"""
+        for row, column in cells:
+            self.tileMap.set(row, column, tile)
+        self.occupancyIndex.fill(*area)
+        self.__setArea(tile, area)
+
+    def split(self, tile, area, cells):
+        """shrinks the tile to the area, the given cells are freed"""
+        for row, column in cells:
+            self.tileMap.set(row, column, None)
+        self.occupancyIndex.free(tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan)
+        self.occupancyIndex.fill(*area)
+        self.__setArea(tile, area)
+
+    def isReplacementPossible(self, tiles, areas):
+        """checks in one pass if the tiles can be moved to the areas, their current areas being freed first"""
+        return self.occupancyIndex.isReplacementPossible(
+            [(tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan) for tile in tiles], areas
+        )
+
+    def rearrange(self, tiles, areas):
+        """moves the tiles to the areas at once, the replacement must have been checked"""
+        self.growRows(max((fromRow + rowSpan for fromRow, _, rowSpan, _ in areas), default=0))
+        for tile in tiles:
+            self.tileMap.fill(None, tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan)
+            self.occupancyIndex.free(tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan)
+        for tile, area in zip(tiles, areas):
+            self.tileMap.fill(tile, *area)
+            self.occupancyIndex.fill(*area)
+            self.__setArea(tile, area)
+
+    def getCompactPlan(self, direction):
+        """returns the tiles moved when every tile is pushed as far as possible in the direction (dirX, dirY) and
+        their new areas: each tile goes on an empty grid, the nearest ones to the edge first"""
+        (dirX, dirY) = direction
+
+        def distanceToEdge(tile):
+            if dirX == -1:
+                return tile.fromColumn
+            if dirX == 1:
+                return self.columnNumber - tile.fromColumn - tile.columnSpan
+            if dirY == -1:
+                return tile.fromRow
+            return self.rowNumber - tile.fromRow - tile.rowSpan
+
+        occupancyIndex = OccupancyIndex(self.rowNumber, self.columnNumber)
+        occupancyIndex.unboundedRows = self.unboundedRows
+        tiles, areas = [], []
+        for tile in sorted(self.tiles, key=distanceToEdge):
+            fromRow, fromColumn, rowSpan, columnSpan = tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan
+            shift = occupancyIndex.freeSpace(direction, fromRow, fromColumn, rowSpan, columnSpan)
+            occupancyIndex.fill(fromRow + shift * dirY, fromColumn + shift * dirX, rowSpan, columnSpan)
+            if shift:
+                tiles.append(tile)
+                areas.append((fromRow + shift * dirY, fromColumn + shift * dirX, rowSpan, columnSpan))
+        return tiles, areas
+
+    def getPushPlan(self, direction, fromRow, fromColumn, rowSpan, columnSpan):
+        """returns the tiles pushed away in the direction (dirX, dirY) by a tile put on the area and their new areas,
+        or None if they do not fit in the grid"""
+        (dirX, dirY) = direction
+        occupancyIndex = OccupancyIndex(self.rowNumber, self.columnNumber)
+        occupancyIndex.unboundedRows = self.unboundedRows
+        occupancyIndex.growRows(fromRow + rowSpan)
+        occupancyIndex.fill(fromRow, fromColumn, rowSpan, columnSpan)
+
+        # the tiles are placed from the nearest to the area side, each one goes forward until it fits
+        tiles, areas = [], []
+        for tile in sorted(self.tiles, key=lambda tile: tile.fromRow * dirY + tile.fromColumn * dirX):
+            shift = occupancyIndex.fitShift(direction, tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan)
+            tileArea = (tile.fromRow + shift * dirY, tile.fromColumn + shift * dirX, tile.rowSpan, tile.columnSpan)
+            if not occupancyIndex.isAreaInside(*tileArea):
+                return None
+            # in the unbounded mode, the tiles pushed past the last row add rows
+            occupancyIndex.growRows(tileArea[0] + tileArea[2])
+            occupancyIndex.fill(*tileArea)
+            if shift:
+                tiles.append(tile)
+                areas.append(tileArea)
+        return tiles, areas
+
+    def getRowInsertionPlan(self, at, rowNumber):
+        """returns the tiles moved or stretched when rowNumber rows are inserted before the row at, and their new
+        areas"""
+        tiles = self.getTilesInArea(at, 0, self.rowNumber - at, self.columnNumber)
+        areas = []
+        for tile in tiles:
+            fromRow, rowSpan = self.__getInsertedSpan(at, rowNumber, tile.fromRow, tile.rowSpan)
+            areas.append((fromRow, tile.fromColumn, rowSpan, tile.columnSpan))
+        return tiles, areas
+
+    def getColumnInsertionPlan(self, at, columnNumber):
+        """returns the tiles moved or stretched when columnNumber columns are inserted before the column at, and
+        their new areas"""
+        tiles = self.getTilesInArea(0, at, self.rowNumber, self.columnNumber - at)
+        areas = []
+        for tile in tiles:
+            fromColumn, columnSpan = self.__getInsertedSpan(at, columnNumber, tile.fromColumn, tile.columnSpan)
+            areas.append((tile.fromRow, fromColumn, tile.rowSpan, columnSpan))
+        return tiles, areas
+
+    def getRowDeletionPlan(self, at, rowNumber):
+        """returns the tiles moved or shrunk when the rows from at to at + rowNumber are deleted and their new areas,
+        or None if a tile is entirely in these rows"""
+        tiles = self.getTilesInArea(at, 0, self.rowNumber - at, self.columnNumber)
+        areas = []
+        for tile in tiles:
+            fromRow, rowSpan = self.__getDeletedSpan(at, rowNumber, tile.fromRow, tile.rowSpan)
+            if rowSpan < 1:
+                return None
+            areas.append((fromRow, tile.fromColumn, rowSpan, tile.columnSpan))
+        return tiles, areas
+
+    def getColumnDeletionPlan(self, at, columnNumber):
+        """returns the tiles moved or shrunk when the columns from at to at + columnNumber are deleted and their new
+        areas, or None if a tile is entirely in these columns"""
+        tiles = self.getTilesInArea(0, at, self.rowNumber, self.columnNumber - at)
+        areas = []
+        for tile in tiles:
+            fromColumn, columnSpan = self.__getDeletedSpan(at, columnNumber, tile.fromColumn, tile.columnSpan)
+            if columnSpan < 1:
+                return None
+            areas.append((tile.fromRow, fromColumn, tile.rowSpan, columnSpan))
+        return tiles, areas
+
+    def growRows(self, toRow):
+        """adds the empty rows needed to reach the row toRow excluded"""
+        if toRow > self.rowNumber:
+            self.addRows(toRow - self.rowNumber)
+
+    def addRows(self, rowNumber):
+        """adds empty rows at the bottom"""
+        self.rowNumber += rowNumber
+        self.occupancyIndex.addRows(rowNumber)
+        self.tileMap.addRows(rowNumber)
+
+    def addColumns(self, columnNumber):
+        """adds empty columns at the right"""
+        self.columnNumber += columnNumber
+        self.occupancyIndex.addColumns(columnNumber)
+        self.tileMap.addColumns(columnNumber)
+
+    def removeRows(self, rowNumber):
+        """removes empty rows from the bottom"""
+        self.rowNumber -= rowNumber
+        self.occupancyIndex.removeRows(rowNumber)
+        self.tileMap.removeRows(rowNumber)
+
+    def removeColumns(self, columnNumber):
+        """removes empty columns from the right"""
+        self.columnNumber -= columnNumber
+        self.occupancyIndex.removeColumns(columnNumber)
+        self.tileMap.removeColumns(columnNumber)
+
+    def __getCellsToSplit(self, tile, direction, fromRow, fromColumn, tileNumber):
+        """finds the cells to split when a tile is decreased"""
+        rowSpan = tile.rowSpan
+        columnSpan = tile.columnSpan
+        (dirX, dirY) = direction
+
+        tileNumber = (
+            tileNumber
+            if -tileNumber * (dirX + dirY) < columnSpan * (dirX != 0) + rowSpan * (dirY != 0)
+            else (1 - columnSpan) * dirX + (1 - rowSpan) * dirY
+        )
+        cells = [
+            (
+                fromRow + row + (rowSpan - 2 * row - 1) * (dirY == 1),
+                fromColumn + column + (columnSpan - 2 * column - 1) * (dirX == 1)
+            )
+            for row in range(-tileNumber * dirY + rowSpan * (dirX != 0))
+            for column in range(-tileNumber * dirX + columnSpan * (dirY != 0))
+        ]
+
+        return tileNumber, cells
+
+    def __getCellsToMerge(self, tile, direction, fromRow, fromColumn, tileNumber):
+        """finds the cells to merge when a tile is increased"""
+        rowSpan = tile.rowSpan
+        columnSpan = tile.columnSpan
+        (dirX, dirY) = direction
+
+        # the occupancy index gives the number of empty rows or columns next to the tile in one pass
+        lineNumber = min(
+            tileNumber * (dirX + dirY),
+            self.occupancyIndex.freeSpace(direction, fromRow, fromColumn, rowSpan, columnSpan)
+        )
+
+        # west or east
+        if dirX != 0:
+            cells = [
+                (fromRow + row, fromColumn + (columnSpan + column) * (dirX == 1) + (-column - 1) * (dirX == -1))
+                for column in range(lineNumber)
+                for row in range(rowSpan)
+            ]
+        # north or south
+        else:
+            cells = [
+                (fromRow + (rowSpan + row) * (dirY == 1) + (-row - 1) * (dirY == -1), fromColumn + column)
+                for row in range(lineNumber)
+                for column in range(columnSpan)
+            ]
+
+        return lineNumber * (dirX + dirY), cells
+
+    @staticmethod
+    def __setArea(tile, area):
+        """gives its new area to the tile"""
+        (tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan) = area
+
+    @staticmethod
+    def __getInsertedSpan(at, lineNumber, start, span):
+        """returns the start and the span of a tile reaching the line at, once lineNumber lines are inserted there"""
+        if start >= at:
+            return start + lineNumber, span
+        return start, span + lineNumber
+
+    @staticmethod
+    def __getDeletedSpan(at, lineNumber, start, span):
+        """returns the start and the span of a tile reaching the line at, once the lines from at to at + lineNumber
+        are deleted"""
+        deleted = max(0, min(start + span, at + lineNumber) - max(start, at))
+        if start >= at + lineNumber:
+            return start - lineNumber, span
+        return min(start, at), span - deleted
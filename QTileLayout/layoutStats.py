@@ -0,0 +1,101 @@
+from collections import deque
+from functools import wraps
+from time import perf_counter
+
+
+class LayoutStats:
+    """
+    Records the count, the durations and the number of touched tiles of the operations of a tileLayout
+    """
+
+    def __init__(self, sampleSize=1024, callback=None):
+        self.sampleSize = sampleSize
+        self.callback = callback
+        self.operations = {}
+        # operations in progress, an operation called by another one is measured in both
+        self.stack = []
+
+    def begin(self, operation):
+        """starts measuring the operation"""
+        self.stack.append([operation, perf_counter(), 0])
+
+    def touch(self, tileNumber=1):
+        """counts the tiles touched by the operations in progress"""
+        for measure in self.stack:
+            measure[2] += tileNumber
+
+    def end(self):
+        """stops measuring the last begun operation and records it"""
+        if not self.stack:
+            return
+        operation, start, tileNumber = self.stack.pop()
+        duration = (perf_counter() - start) * 1000
+
+        if operation not in self.operations:
+            self.operations[operation] = [0, 0.0, 0, deque(maxlen=self.sampleSize)]
+        record = self.operations[operation]
+        record[0] += 1
+        record[1] += duration
+        record[2] += tileNumber
+        record[3].append(duration)
+
+        if self.callback is not None:
+            self.callback(operation, duration, tileNumber)
+
+    def attach(self, tileLayout):
+        """wraps the measured methods of the tileLayout instance, the class methods are left untouched"""
+        for name in dir(type(tileLayout)):
+            operation = getattr(getattr(type(tileLayout), name), 'measuredOperation', None)
+            if operation is not None:
+                setattr(tileLayout, name, self.__measure(operation, getattr(tileLayout, name)))
+
+    def detach(self, tileLayout):
+        """removes the wrappers, the measured methods cost nothing again"""
+        for name in dir(type(tileLayout)):
+            if hasattr(getattr(type(tileLayout), name), 'measuredOperation'):
+                tileLayout.__dict__.pop(name, None)
+
+    def reset(self):
+        """forgets the recorded operations"""
+        self.operations = {}
+
+    def summary(self):
+        """returns the statistics of each recorded operation, durations are in milliseconds"""
+        summary = {}
+        for operation, (count, total, tileNumber, samples) in self.operations.items():
+            samples = sorted(samples)
+            summary[operation] = {
+                'count': count,
+                'total': total,
+                'mean': total / count,
+                'p50': self.__percentile(samples, 50),
+                'p90': self.__percentile(samples, 90),
+                'p99': self.__percentile(samples, 99),
+                'max': samples[-1],
+                'tiles': tileNumber,
+            }
+        return summary
+
+    def __measure(self, operation, method):
+        """returns the method measured as the given operation"""
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            self.begin(operation)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.end()
+        return wrapper
+
+    @staticmethod
+    def __percentile(samples, percent):
+        """returns the nearest rank percentile of the sorted samples"""
+        return samples[max(0, -(-len(samples) * percent // 100) - 1)]
+
+
+def measured(operation):
+    """marks the decorated tileLayout method to be measured, it is only wrapped while the instrumentation is enabled"""
+    def decorator(method):
+        method.measuredOperation = operation
+        return method
+    return decorator
@@ -0,0 +1,68 @@
+from PyQt5 import QtCore, QtWidgets
+from PyQt5.QtWidgets import QVBoxLayout
+
+
+class LazyWidget(QtWidgets.QWidget):
+    """
+    Holds the place of a widget in a tileLayout: the factory building the widget runs the first time the placeholder
+    is painted, which Qt only does once it is in view
+    """
+
+    def __init__(self, factory, *args, **kwargs):
+        super(LazyWidget, self).__init__(*args, **kwargs)
+        self.factory = factory
+        self.contentWidget = None
+        self.widgetCache = None
+        self.instantiationPending = False
+
+        self.layout = QVBoxLayout()
+        self.layout.setSpacing(0)
+        self.layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(self.layout)
+
+    def content(self):
+        """returns the widget built by the factory, or None if it is not built"""
+        return self.contentWidget
+
+    def isInstantiated(self):
+        """returns True if the widget is built"""
+        return self.contentWidget is not None
+
+    def instantiate(self):
+        """builds the widget with the factory if it is not built yet"""
+        self.instantiationPending = False
+        if self.contentWidget is None:
+            self.contentWidget = self.factory()
+            self.layout.addWidget(self.contentWidget)
+        if self.widgetCache is not None:
+            self.widgetCache.use(self)
+
+    def release(self):
+        """destroys the built widget, the factory builds it again the next time the placeholder is painted"""
+        if self.contentWidget is None:
+            return
+        if self.widgetCache is not None:
+            self.widgetCache.discard(self)
+        self.layout.removeWidget(self.contentWidget)
+        self.contentWidget.setParent(None)
+        self.contentWidget.deleteLater()
+        self.contentWidget = None
+
+    def setWidgetCache(self, widgetCache):
+        """gives the cache keeping the built widgets of the layout holding the placeholder"""
+        if self.widgetCache is not None:
+            self.widgetCache.discard(self)
+        self.widgetCache = widgetCache
+        if self.contentWidget is not None and widgetCache is not None:
+            widgetCache.use(self)
+
+    def paintEvent(self, event):
+        """builds the widget once the placeholder is in view, after the paint"""
+        if self.contentWidget is None:
+            if not self.instantiationPending:
+                # widgets are not created nor destroyed during a paint
+                self.instantiationPending = True
+                QtCore.QTimer.singleShot(0, self.instantiate)
+        elif self.widgetCache is not None:
+            self.widgetCache.touch(self)
+        super().paintEvent(event)
@@ -0,0 +1,68 @@
+class LinkHub:
+    """
+    The layouts linked together for drag and drop: it keeps the drag in progress and the layout under the cursor, so
+    that only the layouts whose state changes are recolored
+    """
+
+    def __init__(self, tileLayout):
+        self.layouts = {tileLayout.id: tileLayout}
+        # the ids of the layouts each layout is linked with, itself included
+        self.links = {tileLayout.id: {tileLayout.id}}
+        self.session = None
+        self.draggedLayouts = []
+        self.hoveredLayout = None
+
+    def link(self, layout, otherLayout):
+        """links two layouts, the layouts of the other hub join this one"""
+        otherHub = otherLayout.linkHub
+        if otherHub is not self:
+            for layoutId, tileLayout in otherHub.layouts.items():
+                self.layouts[layoutId] = tileLayout
+                self.links[layoutId] = otherHub.links[layoutId]
+                tileLayout.linkHub = self
+        self.links[layout.id].add(otherLayout.id)
+        self.links[otherLayout.id].add(layout.id)
+
+    def unlink(self, layout, otherLayout):
+        """unlinks two layouts, they stay in the hub"""
+        self.links[layout.id].discard(otherLayout.id)
+        self.links[otherLayout.id].discard(layout.id)
+
+    def isLinked(self, layoutId, otherLayoutId):
+        """returns True if a tile of one layout can be dropped in the other one"""
+        return layoutId in self.links and otherLayoutId in self.links[layoutId]
+
+    def getLayout(self, layoutId):
+        """returns the layout with the given id"""
+        return self.layouts[layoutId]
+
+    def linkedLayouts(self, layout):
+        """returns the layouts linked with the given one, itself included"""
+        return [self.layouts[layoutId] for layoutId in self.links[layout.id]]
+
+    def beginDrag(self, layout, session):
+        """colors the layouts where the dragged tile can go, a group only moves inside its layout"""
+        self.session = session
+        self.hoveredLayout = None
+        if session.group is None:
+            self.draggedLayouts = [tileLayout for tileLayout in self.linkedLayouts(layout) if tileLayout.dragAndDrop]
+        else:
+            self.draggedLayouts = [layout]
+        for tileLayout in self.draggedLayouts:
+            tileLayout.changeTilesColor('drag_and_drop')
+
+    def hover(self, layout):
+        """clears the highlights of the previously hovered layout when the cursor goes to another one"""
+        if layout is self.hoveredLayout:
+            return
+        if self.hoveredLayout is not None:
+            self.hoveredLayout.changeTilesColor('drag_and_drop')
+        self.hoveredLayout = layout
+
+    def endDrag(self):
+        """gives back their idle color to the layouts of the drag"""
+        for tileLayout in self.draggedLayouts:
+            tileLayout.changeTilesColor('idle')
+        self.session = None
+        self.draggedLayouts = []
+        self.hoveredLayout = None
@@ -0,0 +1,101 @@
+import weakref
+
+
+class MouseDispatcher:
+    """
+    Follows the pointer over a tileLayout from the hover events of its parent widget: the tile under the pointer is
+    found through the grid, and its cursor only changes when the pointer goes to another zone of a tile. A zone is
+    the (dirX, dirY) direction of a resize edge, 'grab' or None
+    """
+
+    def __init__(self, tileLayout):
+        self.tileLayout = tileLayout
+        # the parent widget owns the layout, a strong reference would make a cycle through Qt
+        self.widgetRef = None
+        self.tile = None
+        self.zone = None
+
+    def widget(self):
+        """returns the parent widget whose hover events are followed, or None"""
+        return None if self.widgetRef is None else self.widgetRef()
+
+    def setWidget(self, widget):
+        """follows the hover events of the widget, the tile under the pointer is forgotten"""
+        self.widgetRef = None if widget is None else weakref.ref(widget)
+        self.forget()
+
+    def hover(self, point):
+        """updates the cursor for the pointer at the point of the parent widget"""
+        tile = self.tile
+        # the pointer usually stays on the same tile from one event to the next
+        if tile is None or not tile.geometry().contains(point):
+            tile = self.tileAt(point)
+            if tile is None:
+                self.tile = self.zone = None
+                return
+        if tile.lock is not None:
+            # the resize cursor stays until the mouse is released
+            return
+
+        zone = self.zoneAt(tile, point.x() - tile.x(), point.y() - tile.y())
+        if tile is self.tile and zone == self.zone:
+            return
+        self.tile, self.zone = tile, zone
+        tile.setCursor(self.cursorOf(zone))
+
+    def leave(self):
+        """forgets the tile when the pointer leaves the parent widget"""
+        self.tile = self.zone = None
+
+    def forget(self, tile=None):
+        """forgets the tile, or the tile under the pointer if tile is None, its cursor is set again at the next
+        move"""
+        if tile is None or tile is self.tile:
+            self.tile = self.zone = None
+
+    def tileAt(self, point):
+        """returns the tile under the point of the parent widget, or None"""
+        cell = self.tileLayout.cellAt(point)
+        if cell is None:
+            return None
+        tile = self.tileLayout.gridModel.tileAt(*cell)
+        # the spacing between the tiles belongs to the cells but not to the tiles
+        if tile is None or not tile.geometry().contains(point):
+            return None
+        return tile
+
+    def edgeAt(self, tile, x, y):
+        """returns the direction of the resize edge under the point (x, y) of the tile, or None"""
+        if not self.tileLayout.resizable:
+            return None
+        margin = tile.resizeMargin
+        if 0 <= x < margin:
+            return -1, 0
+        if tile.width() >= x > tile.width() - margin:
+            return 1, 0
+        if 0 <= y < margin:
+            return 0, -1
+        if tile.height() >= y > tile.height() - margin:
+            return 0, 1
+        return None
+
+    def zoneAt(self, tile, x, y):
+        """returns the zone under the point (x, y) of the tile"""
+        if not tile.filled:
+            return None
+        edge = self.edgeAt(tile, x, y)
+        if edge is not None:
+            return edge
+        if self.tileLayout.dragAndDrop:
+            return 'grab'
+        return None
+
+    def cursorOf(self, zone):
+        """returns the cursor shape of the zone"""
+        if zone in ((-1, 0), (1, 0)):
+            return self.tileLayout.cursorResizeHorizontal
+        if zone in ((0, -1), (0, 1)):
+            return self.tileLayout.cursorResizeVertical
+        if zone == 'grab':
+            return self.tileLayout.cursorGrab
+        return self.tileLayout.cursorIdle
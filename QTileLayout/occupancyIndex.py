@@ -0,0 +1,186 @@
+class OccupancyIndex:
+    """
+    Keeps track of the filled cells of a tileLayout with one bit mask per row and one bit mask per column
+    """
+
+    def __init__(self, rowNumber, columnNumber):
+        self.rowNumber = rowNumber
+        self.columnNumber = columnNumber
+        self.rowMasks = [0] * rowNumber
+        self.columnMasks = [0] * columnNumber
+        # the rows past the last one are considered empty, the grid grows when they are filled
+        self.unboundedRows = False
+
+    def copy(self):
+        """returns an independent copy of the index"""
+        occupancyIndex = OccupancyIndex(0, 0)
+        occupancyIndex.rowNumber = self.rowNumber
+        occupancyIndex.columnNumber = self.columnNumber
+        occupancyIndex.rowMasks = list(self.rowMasks)
+        occupancyIndex.columnMasks = list(self.columnMasks)
+        occupancyIndex.unboundedRows = self.unboundedRows
+        return occupancyIndex
+
+    def fill(self, fromRow, fromColumn, rowSpan, columnSpan):
+        """marks the given area as filled"""
+        rowBits = ((1 << columnSpan) - 1) << fromColumn
+        columnBits = ((1 << rowSpan) - 1) << fromRow
+        for row in range(fromRow, fromRow + rowSpan):
+            self.rowMasks[row] |= rowBits
+        for column in range(fromColumn, fromColumn + columnSpan):
+            self.columnMasks[column] |= columnBits
+
+    def free(self, fromRow, fromColumn, rowSpan, columnSpan):
+        """marks the given area as empty"""
+        rowBits = ~(((1 << columnSpan) - 1) << fromColumn)
+        columnBits = ~(((1 << rowSpan) - 1) << fromRow)
+        for row in range(fromRow, fromRow + rowSpan):
+            self.rowMasks[row] &= rowBits
+        for column in range(fromColumn, fromColumn + columnSpan):
+            self.columnMasks[column] &= columnBits
+
+    def isFilled(self, row, column):
+        """returns True if the cell (row, column) is filled"""
+        return bool(self.rowMasks[row] >> column & 1)
+
+    def isAreaInside(self, fromRow, fromColumn, rowSpan, columnSpan):
+        """checks if the given area is inside the grid"""
+        return (
+            fromRow >= 0 and fromColumn >= 0
+            and (fromRow + rowSpan <= self.rowNumber or self.unboundedRows)
+            and fromColumn + columnSpan <= self.columnNumber
+        )
+
+    def isAreaEmpty(self, fromRow, fromColumn, rowSpan, columnSpan):
+        """checks if the given area, which must be inside the grid, has no filled cell"""
+        rowBits = ((1 << columnSpan) - 1) << fromColumn
+        # the slice stops at the last row, the rows past it are empty
+        for rowMask in self.rowMasks[fromRow:fromRow + rowSpan]:
+            if rowMask & rowBits:
+                return False
+        return True
+
+    def isReplacementPossible(self, oldAreas, newAreas):
+        """checks in one pass if the areas can be moved to the new ones, the old areas being freed first"""
+        freedMasks = {}
+        for fromRow, fromColumn, rowSpan, columnSpan in oldAreas:
+            rowBits = ((1 << columnSpan) - 1) << fromColumn
+            for row in range(fromRow, fromRow + rowSpan):
+                freedMasks[row] = freedMasks.get(row, 0) | rowBits
+
+        takenMasks = {}
+        for fromRow, fromColumn, rowSpan, columnSpan in newAreas:
+            if rowSpan < 1 or columnSpan < 1 or not self.isAreaInside(fromRow, fromColumn, rowSpan, columnSpan):
+                return False
+            rowBits = ((1 << columnSpan) - 1) << fromColumn
+            for row in range(fromRow, fromRow + rowSpan):
+                rowMask = self.rowMasks[row] if row < self.rowNumber else 0
+                filledBits = (rowMask & ~freedMasks.get(row, 0)) | takenMasks.get(row, 0)
+                if filledBits & rowBits:
+                    return False
+                takenMasks[row] = takenMasks.get(row, 0) | rowBits
+        return True
+
+    def firstFit(self, rowSpan, columnSpan):
+        """returns the first (row, column), row by row, where the area is empty, or None if there is none"""
+        if columnSpan > self.columnNumber:
+            return None
+        fullBits = (1 << self.columnNumber) - 1
+        # in the unbounded mode, the row after the last one always fits
+        lastRow = self.rowNumber if self.unboundedRows else self.rowNumber - rowSpan
+        for fromRow in range(lastRow + 1):
+            filledBits = 0
+            for row in range(fromRow, min(fromRow + rowSpan, self.rowNumber)):
+                filledBits |= self.rowMasks[row]
+            # a bit stays set where columnSpan empty cells start
+            startBits = ~filledBits & fullBits
+            for column in range(1, columnSpan):
+                startBits &= ~filledBits >> column
+            startBits &= (1 << (self.columnNumber - columnSpan + 1)) - 1
+            if startBits:
+                return fromRow, (startBits & -startBits).bit_length() - 1
+        return None
+
+    def freeSpace(self, direction, fromRow, fromColumn, rowSpan, columnSpan):
+        """returns how many empty rows or columns follow the given area in the direction (dirX, dirY)"""
+        (dirX, dirY) = direction
+
+        if dirX != 0:
+            masks = self.rowMasks[fromRow:fromRow + rowSpan]
+            start, span, size = fromColumn, columnSpan, self.columnNumber
+            forward = dirX == 1
+        else:
+            masks = self.columnMasks[fromColumn:fromColumn + columnSpan]
+            start, span, size = fromRow, rowSpan, self.rowNumber
+            forward = dirY == 1
+
+        if forward:
+            end = start + span
+            freeSpace = size - end
+            for mask in masks:
+                mask >>= end
+                if mask:
+                    # index of the lowest filled cell after the area
+                    freeSpace = min(freeSpace, (mask & -mask).bit_length() - 1)
+        else:
+            freeSpace = start
+            lowBits = (1 << start) - 1
+            for mask in masks:
+                mask &= lowBits
+                if mask:
+                    # distance to the highest filled cell before the area
+                    freeSpace = min(freeSpace, start - mask.bit_length())
+        return freeSpace
+
+    def fitShift(self, direction, fromRow, fromColumn, rowSpan, columnSpan):
+        """returns by how many rows or columns the area must go forward in the direction (dirX, dirY) to be empty,
+        the end of the grid is not checked"""
+        (dirX, dirY) = direction
+        if dirX != 0:
+            masks = self.rowMasks[fromRow:fromRow + rowSpan]
+            start, span = fromColumn, columnSpan
+        else:
+            masks = self.columnMasks[fromColumn:fromColumn + columnSpan]
+            start, span = fromRow, rowSpan
+
+        position = start
+        while True:
+            window = ((1 << span) - 1) << position
+            lastFilled = -1
+            for mask in masks:
+                filledBits = mask & window
+                if filledBits:
+                    lastFilled = max(lastFilled, filledBits.bit_length() - 1)
+            if lastFilled < 0:
+                return position - start
+            # the area has to start after the last filled cell it covers
+            position = lastFilled + 1
+
+    def growRows(self, toRow):
+        """adds the empty rows needed to reach the row toRow excluded"""
+        if toRow > self.rowNumber:
+            self.addRows(toRow - self.rowNumber)
+
+    def addRows(self, rowNumber):
+        """adds empty rows at the bottom"""
+        self.rowMasks.extend([0] * rowNumber)
+        self.rowNumber += rowNumber
+
+    def addColumns(self, columnNumber):
+        """adds empty columns at the right"""
+        self.columnMasks.extend([0] * columnNumber)
+        self.columnNumber += columnNumber
+
+    def removeRows(self, rowNumber):
+        """removes rows from the bottom"""
+        self.rowNumber -= rowNumber
+        self.rowMasks = self.rowMasks[:self.rowNumber]
+        columnBits = (1 << self.rowNumber) - 1
+        self.columnMasks = [mask & columnBits for mask in self.columnMasks]
+
+    def removeColumns(self, columnNumber):
+        """removes columns from the right"""
+        self.columnNumber -= columnNumber
+        self.columnMasks = self.columnMasks[:self.columnNumber]
+        rowBits = (1 << self.columnNumber) - 1
+        self.rowMasks = [mask & rowBits for mask in self.rowMasks]
@@ -0,0 +1,48 @@
+class ResizeSession:
+    """
+    The tile being resized: the extent it can reach in the locked direction is computed once, when the resize starts
+    """
+
+    def __init__(self, tile, direction, maxGrowth):
+        self.tile = tile
+        self.direction = direction
+        self.fromRow = tile.fromRow
+        self.fromColumn = tile.fromColumn
+        self.rowSpan = tile.rowSpan
+        self.columnSpan = tile.columnSpan
+        (dirX, dirY) = direction
+        # the tile can lose all its rows or columns but one, and grow over the empty ones next to it
+        self.minGrowth = 1 - self.columnSpan * (dirX != 0) - self.rowSpan * (dirY != 0)
+        self.maxGrowth = maxGrowth
+        self.previewArea = self.area(0)
+
+    def area(self, tileNumber):
+        """returns the (fromRow, fromColumn, rowSpan, columnSpan) of the tile resized by tileNumber cells"""
+        (dirX, dirY) = self.direction
+        growth = min(max(tileNumber * (dirX + dirY), self.minGrowth), self.maxGrowth)
+        return (
+            self.fromRow - growth * (dirY == -1),
+            self.fromColumn - growth * (dirX == -1),
+            self.rowSpan + growth * (dirY != 0),
+            self.columnSpan + growth * (dirX != 0),
+        )
+
+    def cells(self, area):
+        """returns the cells of the area that are not in the tile or the cells of the tile that are not in the area"""
+        (fromRow, fromColumn, rowSpan, columnSpan) = area
+        if rowSpan * columnSpan < self.rowSpan * self.columnSpan:
+            (fromRow, fromColumn, rowSpan, columnSpan), inner = (
+                (self.fromRow, self.fromColumn, self.rowSpan, self.columnSpan), area
+            )
+        else:
+            inner = (self.fromRow, self.fromColumn, self.rowSpan, self.columnSpan)
+        (innerRow, innerColumn, innerRowSpan, innerColumnSpan) = inner
+
+        return [
+            (row, column)
+            for row in range(fromRow, fromRow + rowSpan)
+            for column in range(fromColumn, fromColumn + columnSpan)
+            if not (
+                innerRow <= row < innerRow + innerRowSpan and innerColumn <= column < innerColumn + innerColumnSpan
+            )
+        ]
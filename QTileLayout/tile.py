@@ -1,9 +1,9 @@
-from json import JSONDecodeError
 from PyQt5 import QtWidgets, QtGui
-from PyQt5.QtCore import Qt, QMimeData, QByteArray
-from PyQt5.QtGui import QDrag
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QDrag, QPixmap
 from PyQt5.QtWidgets import QVBoxLayout
-import json
+
+from .dragSession import DragSession, TileMimeData
 
 
 class Tile(QtWidgets.QWidget):
@@ -15,7 +15,6 @@ class Tile(QtWidgets.QWidget):
                  **kwargs):
         super(Tile, self).__init__(*args, **kwargs)
         self.tileLayout = tileLayout
-        self.originTileLayout = self.tileLayout
         self.fromRow = fromRow
         self.fromColumn = fromColumn
         self.rowSpan = rowSpan
@@ -27,8 +26,13 @@ class Tile(QtWidgets.QWidget):
         self.filled = False
         self.widget = None
         self.lock = None
+        self.resizeSession = None
         self.dragInProcess = False
+        self.dropCell = None
+        self.dropPossible = False
         self.currentTileNumber = 0
+        # last frame of the widget, shown while the widget is hibernated
+        self.pixmap = None
         self.layout = QVBoxLayout()
         self.layout.setSpacing(0)
         self.layout.setContentsMargins(0, 0, 0, 0)
@@ -36,7 +40,6 @@ class Tile(QtWidgets.QWidget):
         self.__mouseMovePos = None
         self.__updateSizeLimit()
         self.setAcceptDrops(True)
-        self.setMouseTracking(True)
         self.setLayout(self.layout)
 
     def updateSize(self, fromRow=None, fromColumn=None, rowSpan=None, columnSpan=None, verticalSpan=None,
@@ -56,6 +59,24 @@ class Tile(QtWidgets.QWidget):
         self.widget = widget
         self.filled = True
 
+    def clear(self):
+        """empties the tile so that it can hold another widget, a widget left in it loses its parent"""
+        if self.widget is not None and self.widget.parentWidget() is self:
+            self.layout.removeWidget(self.widget)
+            self.widget.setParent(None)
+        self.widget = None
+        self.filled = False
+        self.lock = None
+        self.resizeSession = None
+        self.currentTileNumber = 0
+        self.pixmap = None
+        self.__mouseMovePos = None
+
+    def setPixmap(self, pixmap):
+        """shows the pixmap in place of the widget while it does not paint, or nothing if pixmap is None"""
+        self.pixmap = pixmap
+        self.update()
+
     def getFromRow(self):
         """returns the tile from row"""
         return self.fromRow
@@ -76,13 +97,15 @@ class Tile(QtWidgets.QWidget):
         """returns True if there is a widget in the tile, else False"""
         return self.filled
 
-    def changeColor(self, color):
-        """Changes the tile background color"""
-        self.setAutoFillBackground(True)
-        self.setPalette(color)
+    def paintEvent(self, event):
+        """paints the last frame of a hibernated widget, the tile is transparent otherwise"""
+        if self.pixmap is not None:
+            painter = QtGui.QPainter(self)
+            painter.drawPixmap(0, 0, self.pixmap)
+            painter.end()
 
     def mouseMoveEvent(self, event):
-        """actions to do when the mouse is moved"""
+        """actions to do when the mouse is moved with a button pressed, the cursor is set by the layout"""
         if event.buttons() == Qt.LeftButton:
 
             # adjust offset from clicked point to origin of widget
@@ -95,62 +118,44 @@ class Tile(QtWidgets.QWidget):
                 if diff.manhattanLength() > 3:
 
                     if self.filled and self.tileLayout.dragAndDrop:
+                        # the drag start latency goes from here to the beginning of the drag loop
+                        if self.tileLayout.layoutStats is not None:
+                            self.tileLayout.layoutStats.begin('dragStart')
                         drag = self.__prepareDropData(event)
-                        self.__dragAndDropProcess(drag)
-                        for key, value in self.tileLayout.linkedLayout.items():
-                            value.changeTilesColor('idle')
+                        if drag.mimeData().session.group is None:
+                            self.__dragAndDropProcess(drag)
+                        else:
+                            self.__groupDragProcess(drag)
+                        self.tileLayout.linkHub.endDrag()
 
                     if self.filled and self.tileLayout.focus:
                         self.widget.setFocus()
 
-        if not self.filled:
-            self.setCursor(QtGui.QCursor(self.tileLayout.cursorIdle))
-
-        elif self.lock is None:
-
-            westCondition = 0 <= event.pos().x() < self.resizeMargin
-            eastCondition = self.width() >= event.pos().x() > self.width() - self.resizeMargin
-            northCondition = 0 <= event.pos().y() < self.resizeMargin
-            southCondition = self.height() >= event.pos().y() > self.height() - self.resizeMargin
-
-            if (westCondition or eastCondition) and self.tileLayout.resizable:
-                self.setCursor(QtGui.QCursor(self.tileLayout.cursorResizeHorizontal))
-
-            elif (northCondition or southCondition) and self.tileLayout.resizable:
-                self.setCursor(QtGui.QCursor(self.tileLayout.cursorResizeVertical))
-
-            elif self.tileLayout.dragAndDrop and self.rect().contains(event.pos()):
-                self.setCursor(QtGui.QCursor(self.tileLayout.cursorGrab))
-
-            else:
-                self.setCursor(QtGui.QCursor(self.tileLayout.cursorIdle))
-
-        else:
+        if self.lock is not None:
             # highlight tiles that are going to be merged in the resizing
             x, y = event.pos().x(), event.pos().y()
             tileNumber = self.__getResizeTileNumber(x, y)
 
             if tileNumber != self.currentTileNumber:
                 self.currentTileNumber = tileNumber
-                self.tileLayout.changeTilesColor('resize')
-                self.tileLayout.highlightTiles(self.lock, self.fromRow, self.fromColumn, tileNumber)
+                self.tileLayout.previewResize(self.resizeSession, tileNumber)
 
         super().mouseMoveEvent(event)
 
     def mousePressEvent(self, event):
         """actions to do when the mouse button is pressed"""
-        if event.button() == Qt.LeftButton:
+        if event.button() == Qt.LeftButton and self.filled and event.modifiers() & Qt.ControlModifier:
+            # a control click adds the tile to the selection or removes it
             self.__mouseMovePos = event.pos()
-            if event.pos().x() < self.resizeMargin and self.tileLayout.resizable:
-                self.lock = (-1, 0)  # 'west'
-            elif event.pos().x() > self.width() - self.resizeMargin and self.tileLayout.resizable:
-                self.lock = (1, 0)  # 'east'
-            elif event.pos().y() < self.resizeMargin and self.tileLayout.resizable:
-                self.lock = (0, -1)  # 'north'
-            elif event.pos().y() > self.height() - self.resizeMargin and self.tileLayout.resizable:
-                self.lock = (0, 1)  # 'south'
+            self.tileLayout.selectWidget(self.widget, self.widget not in self.tileLayout.selection)
+        elif event.button() == Qt.LeftButton:
+            self.__mouseMovePos = event.pos()
+            if self.filled and self.widget not in self.tileLayout.selection:
+                self.tileLayout.clearSelection()
+            # the edges are the same as the ones showing a resize cursor
+            self.lock = self.tileLayout.mouseDispatcher.edgeAt(self, event.pos().x(), event.pos().y())
             if self.lock is not None:
-                self.tileLayout.changeTilesColor('resize')
+                self.resizeSession = self.tileLayout.beginResize(self.lock, self.fromRow, self.fromColumn)
         else:
             self.__mouseMovePos = None
         super().mousePressEvent(event)
@@ -164,62 +169,83 @@ class Tile(QtWidgets.QWidget):
         x, y = event.pos().x(), event.pos().y()
         tileNumber = self.__getResizeTileNumber(x, y)
 
-        self.tileLayout.resizeTile(self.lock, self.fromRow, self.fromColumn, tileNumber)
-        self.tileLayout.changeTilesColor('idle')
+        self.tileLayout.endResize(self.resizeSession, tileNumber)
         self.currentTileNumber = 0
         self.lock = None
+        self.resizeSession = None
+        self.tileLayout.mouseDispatcher.forget(self)
         super().mouseReleaseEvent(event)
 
     def dragEnterEvent(self, event):
-        """checks if a tile can be drop on this one"""
-        if self.tileLayout.dragAndDrop and event.mimeData().hasFormat('TileData') and self.__isDropPossible(event):
+        """accepts the tile drags to be notified of the cell under the cursor"""
+        self.dropCell = None
+        if self.tileLayout.dragAndDrop and event.mimeData().hasFormat('TileData'):
             event.acceptProposedAction()
 
+    def dragMoveEvent(self, event):
+        """checks if a tile can be dropped on the cell under the cursor, merged tiles cover several cells"""
+        cell = self.__cellAt(event.pos())
+        if cell != self.dropCell:
+            self.dropCell = cell
+            self.dropPossible = self.tileLayout.isDropPossible(event, *cell)
+
+        if self.dropPossible:
+            event.acceptProposedAction()
+        else:
+            event.ignore()
+
+    def dragLeaveEvent(self, event):
+        """forgets the last checked cell"""
+        self.dropCell = None
+
     def dropEvent(self, event):
         """actions to do when a tile is dropped on this one"""
-        dropData = json.loads(event.mimeData().data('TileData').data())
-        widget = self.originTileLayout.getWidgetToDrop()
-
-        self.tileLayout.addWidget(
-            widget,
-            self.fromRow - dropData['row_offset'],
-            self.fromColumn - dropData['column_offset'],
-            dropData['row_span'],
-            dropData['column_span']
-        )
-        self.tileLayout.tileMoved.emit(
-            widget,
-            dropData['id'],
-            self.tileLayout.id,
-            dropData['from_row'],
-            dropData['from_column'],
-            self.fromRow - dropData['row_offset'],
-            self.fromColumn - dropData['column_offset'],
-        )
+        cell = self.__cellAt(event.pos())
+        if cell != self.dropCell:
+            self.dropPossible = self.tileLayout.isDropPossible(event, *cell)
+        self.dropCell = None
 
-        event.acceptProposedAction()
+        if self.dropPossible:
+            self.tileLayout.dropWidget(event, *cell)
+            event.acceptProposedAction()
+        else:
+            event.ignore()
 
     def __prepareDropData(self, event):
         """prepares data for the drag and drop process"""
         drag = QDrag(self)
 
-        dropData = QMimeData()
-        data = {
-            'id': self.tileLayout.id,
-            'from_row': self.fromRow,
-            'from_column': self.fromColumn,
-            'row_span': self.rowSpan,
-            'column_span': self.columnSpan,
-            'row_offset': event.pos().y() // (self.verticalSpan + self.tileLayout.verticalSpacing()),
-            'column_offset': event.pos().x() // (self.horizontalSpan + self.tileLayout.horizontalSpacing()),
-        }
-        dataToText = json.dumps(data)
-        dropData.setData('TileData', QByteArray(dataToText.encode()))
-        dragIcon = self.widget.grab()
+        session = DragSession(
+            self.tileLayout.id,
+            self.fromRow,
+            self.fromColumn,
+            self.rowSpan,
+            self.columnSpan,
+            event.pos().y() // self.tileLayout.rowPitch,
+            event.pos().x() // self.tileLayout.columnPitch,
+            self.widget,
+            self.__getDraggedGroup(),
+        )
+        hotSpot = event.pos() - self.rect().topLeft()
+
+        if self.tileLayout.dragPreview == 'placeholder':
+            dragIcon = QPixmap(self.size())
+            dragIcon.fill(QtGui.QColor(*self.tileLayout.colorMap['drag_and_drop']))
+        elif self.tileLayout.dragPreview == 'scaled':
+            scale = self.tileLayout.dragPreviewScale
+            dragIcon = QPixmap(self.widget.size() * scale)
+            dragIcon.fill(Qt.transparent)
+            painter = QtGui.QPainter(dragIcon)
+            painter.scale(scale, scale)
+            self.widget.render(painter)
+            painter.end()
+            hotSpot *= scale
+        else:
+            dragIcon = self.widget.grab()
 
         drag.setPixmap(dragIcon)
-        drag.setMimeData(dropData)
-        drag.setHotSpot(event.pos() - self.rect().topLeft())
+        drag.setMimeData(TileMimeData(session))
+        drag.setHotSpot(hotSpot)
 
         return drag
 
@@ -233,11 +259,14 @@ class Tile(QtWidgets.QWidget):
         self.widget.clearFocus()
         self.tileLayout.removeWidget(self.widget)
         self.setVisible(False)
-        for key, value in self.tileLayout.linkedLayout.items():
-            if value.dragAndDrop:
-                value.changeTilesColor('drag_and_drop')
+        self.tileLayout.linkHub.beginDrag(self.tileLayout, drag.mimeData().session)
+
+        if self.tileLayout.layoutStats is not None:
+            self.tileLayout.layoutStats.end()
 
-        if drag.exec_() != 2:
+        draggedWidget = self.widget
+        dropped = drag.exec_() == 2
+        if not dropped:
             self.__removeWidget()
             widget = self.tileLayout.getWidgetToDrop()
             self.tileLayout.addWidget(
@@ -250,32 +279,36 @@ class Tile(QtWidgets.QWidget):
             if self.tileLayout.focus:
                 widget.setFocus()
 
-        self.originTileLayout = self.tileLayout
-        self.setVisible(True)
+        drag.deleteLater()
         self.dragInProcess = False
+        self.tileLayout.recycleTile(self)
+        # the gravity is suspended while the widget is dragged, a drop in its own layout already compacted it
+        if self.tileLayout.gravity is not None and not (dropped and draggedWidget in self.tileLayout.tileRegistry):
+            self.tileLayout.compact(self.tileLayout.gravity)
 
-    def __isDropPossible(self, event):
-        """checks if this tile can accept the drop"""
-        try:
-            dropData = json.loads(event.mimeData().data('TileData').data())
-        except JSONDecodeError:
-            return False
+    def __groupDragProcess(self, drag):
+        """manages the drag and drop of the selected tiles, they stay in place until the drop moves them together"""
+        self.dragInProcess = True
+        self.tileLayout.linkHub.beginDrag(self.tileLayout, drag.mimeData().session)
+        if self.tileLayout.layoutStats is not None:
+            self.tileLayout.layoutStats.end()
 
-        if dropData['id'] not in self.tileLayout.linkedLayout:
-            return False
-        else:
-            self.originTileLayout = self.tileLayout.linkedLayout[dropData['id']]
-
-        for key, value in self.originTileLayout.linkedLayout.items():
-            if value.dragAndDrop:
-                value.changeTilesColor('drag_and_drop')
-
-        return self.tileLayout.isAreaEmpty(
-            self.fromRow - dropData['row_offset'],
-            self.fromColumn - dropData['column_offset'],
-            dropData['row_span'],
-            dropData['column_span'],
-            color='drag_and_drop'
+        drag.exec_()
+        drag.deleteLater()
+        self.dragInProcess = False
+
+    def __getDraggedGroup(self):
+        """returns the selected widgets if the widget of this tile is selected with others, else None"""
+        selection = self.tileLayout.selection
+        if self.widget in selection and len(selection) > 1:
+            return list(selection)
+        return None
+
+    def __cellAt(self, pos):
+        """returns the cell of the layout under the position in the tile"""
+        return (
+            self.fromRow + min(pos.y() // self.tileLayout.rowPitch, self.rowSpan - 1),
+            self.fromColumn + min(pos.x() // self.tileLayout.columnPitch, self.columnSpan - 1),
         )
 
     def __getResizeTileNumber(self, x, y):
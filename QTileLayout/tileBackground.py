@@ -0,0 +1,275 @@
+from PyQt5 import QtWidgets, QtGui
+from PyQt5.QtCore import Qt, QRect, QSize
+from PyQt5.QtGui import QRegion
+
+
+class TileBackground(QtWidgets.QWidget):
+    """
+    The widget spanning the whole grid behind the tiles: it paints the color of every cell, highlights included, and
+    receives the drops on the empty ones
+    """
+
+    def __init__(self, tileLayout, *args, **kwargs):
+        super(TileBackground, self).__init__(*args, **kwargs)
+        self.tileLayout = tileLayout
+        self.color = tileLayout.colorMap['idle']
+        self.highlightedAreas = []
+        self.previewAreas = []
+        self.dropCell = None
+        self.dropPossible = False
+        self.rubberBand = None
+        self.selectionOrigin = None
+        # the cell pixmaps by color, for the cell size they were made for
+        self.cellPixmaps = {}
+        self.cellPixmapSize = None
+
+        sizePolicy = self.sizePolicy()
+        sizePolicy.setHorizontalPolicy(QtWidgets.QSizePolicy.Ignored)
+        sizePolicy.setVerticalPolicy(QtWidgets.QSizePolicy.Ignored)
+        self.setSizePolicy(sizePolicy)
+        self.setAcceptDrops(True)
+
+    def changeColor(self, colorChoice, fromTile, toTile):
+        """changes the color of the empty cells in the given area and repaints only the cells whose color changed"""
+        color = self.tileLayout.colorMap[colorChoice]
+
+        if fromTile == (0, 0) and toTile == (self.tileLayout.rowNumber, self.tileLayout.columnNumber):
+            if color != self.color:
+                self.update()
+            else:
+                # a single update of the union of the areas that lose their highlight
+                region = QRegion()
+                for areaColor, areaFromTile, areaToTile in self.highlightedAreas:
+                    if areaColor != color:
+                        region += self.areaRect(areaFromTile, areaToTile)
+                if not region.isEmpty():
+                    self.update(region)
+            self.color = color
+            self.highlightedAreas = []
+            self.setPreviewAreas([])
+
+        elif (color, fromTile, toTile) not in self.highlightedAreas[-1:]:
+            self.highlightedAreas.append((color, fromTile, toTile))
+            self.update(self.areaRect(fromTile, toTile))
+
+    def setPreviewAreas(self, areas):
+        """outlines the given (fromTile, toTile) areas over the cells, where the tiles will go"""
+        if areas == self.previewAreas:
+            return
+        region = QRegion()
+        for fromTile, toTile in self.previewAreas + areas:
+            region += self.areaRect(fromTile, toTile)
+        self.previewAreas = areas
+        self.update(region)
+
+    def replaceHighlight(self, colorChoice, fromTile, toTile):
+        """replaces the highlighted areas by the given one and repaints only the cells whose color changes"""
+        color = self.tileLayout.colorMap[colorChoice]
+        if self.highlightedAreas == [(color, fromTile, toTile)]:
+            return
+
+        previousRegion = QRegion()
+        sameColor = True
+        for areaColor, areaFromTile, areaToTile in self.highlightedAreas:
+            previousRegion += self.areaRect(areaFromTile, areaToTile)
+            sameColor = sameColor and areaColor == color
+        region = QRegion(self.areaRect(fromTile, toTile))
+
+        self.highlightedAreas = [(color, fromTile, toTile)]
+        self.update(previousRegion.xored(region) if sameColor else previousRegion.united(region))
+
+    def cellAt(self, x, y):
+        """returns the (row, column) of the cell under the point (x, y)"""
+        row = y // self.tileLayout.rowPitch
+        column = x // self.tileLayout.columnPitch
+        return (
+            min(max(row, 0), self.tileLayout.rowNumber - 1),
+            min(max(column, 0), self.tileLayout.columnNumber - 1),
+        )
+
+    def cellRect(self, row, column):
+        """returns the geometry of the cell at (row, column) in the background coordinates"""
+        return QRect(
+            column * self.tileLayout.columnPitch,
+            row * self.tileLayout.rowPitch,
+            self.tileLayout.horizontalSpan,
+            self.tileLayout.verticalSpan,
+        )
+
+    def areaRect(self, fromTile, toTile):
+        """returns the geometry of the cells area starting at fromTile and spanning toTile"""
+        return self.cellRect(*fromTile).united(
+            self.cellRect(fromTile[0] + toTile[0] - 1, fromTile[1] + toTile[1] - 1)
+        )
+
+    def paintEvent(self, event):
+        """paints the cells that intersect the area to refresh, the tiles are transparent and show the idle color"""
+        area = event.rect()
+        fromRow, fromColumn = self.cellAt(area.left(), area.top())
+        toRow, toColumn = self.cellAt(area.right(), area.bottom())
+        painter = QtGui.QPainter(self)
+        painter.setClipRegion(event.region())
+
+        self.__paintTiles(painter, fromRow, fromColumn, toRow + 1, toColumn + 1)
+        self.__paintCells(painter, self.color, fromRow, fromColumn, toRow + 1, toColumn + 1)
+        for color, fromTile, toTile in self.highlightedAreas:
+            self.__paintCells(
+                painter,
+                color,
+                max(fromRow, fromTile[0]),
+                max(fromColumn, fromTile[1]),
+                min(toRow + 1, fromTile[0] + toTile[0]),
+                min(toColumn + 1, fromTile[1] + toTile[1]),
+            )
+        self.__paintPreviewAreas(painter)
+
+    def mousePressEvent(self, event):
+        """starts a rubber band selection, the current selection is kept with the control key"""
+        if event.button() != Qt.LeftButton:
+            super().mousePressEvent(event)
+            return
+
+        if not event.modifiers() & Qt.ControlModifier:
+            self.tileLayout.clearSelection()
+        if self.rubberBand is None:
+            # the rubber band belongs to the parent widget to be drawn over the tiles
+            self.rubberBand = QtWidgets.QRubberBand(QtWidgets.QRubberBand.Rectangle, self.parentWidget())
+        self.selectionOrigin = self.mapToParent(event.pos())
+        self.rubberBand.setGeometry(QRect(self.selectionOrigin, self.selectionOrigin))
+        self.rubberBand.show()
+        self.rubberBand.raise_()
+
+    def mouseMoveEvent(self, event):
+        """stretches the rubber band to the cursor"""
+        if self.selectionOrigin is not None:
+            self.rubberBand.setGeometry(QRect(self.selectionOrigin, self.mapToParent(event.pos())).normalized())
+        super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        """selects the tiles intersecting the rubber band"""
+        if self.selectionOrigin is not None:
+            self.rubberBand.hide()
+            self.selectionOrigin = None
+            self.tileLayout.selectArea(self.rubberBand.geometry(), add=True)
+        super().mouseReleaseEvent(event)
+
+    def dragEnterEvent(self, event):
+        """accepts the tile drags to be notified of the cell under the cursor"""
+        self.dropCell = None
+        if self.tileLayout.dragAndDrop and event.mimeData().hasFormat('TileData'):
+            event.acceptProposedAction()
+
+    def dragMoveEvent(self, event):
+        """checks if a tile can be dropped on the cell under the cursor"""
+        cell = self.cellAt(event.pos().x(), event.pos().y())
+        if cell != self.dropCell:
+            self.dropCell = cell
+            self.dropPossible = self.tileLayout.isDropPossible(event, *cell)
+
+        if self.dropPossible:
+            event.acceptProposedAction()
+        else:
+            event.ignore()
+
+    def dragLeaveEvent(self, event):
+        """forgets the last checked cell"""
+        self.dropCell = None
+
+    def dropEvent(self, event):
+        """actions to do when a tile is dropped on an empty cell"""
+        cell = self.cellAt(event.pos().x(), event.pos().y())
+        if cell != self.dropCell:
+            self.dropPossible = self.tileLayout.isDropPossible(event, *cell)
+        self.dropCell = None
+
+        if self.dropPossible:
+            self.tileLayout.dropWidget(event, *cell)
+            event.acceptProposedAction()
+        else:
+            event.ignore()
+
+    def __paintTiles(self, painter, fromRow, fromColumn, toRow, toColumn):
+        """paints the idle or selection color under the tiles that intersect the cells between (fromRow, fromColumn)
+        included and (toRow, toColumn) excluded"""
+        idleColor = QtGui.QColor(*self.tileLayout.colorMap['idle'])
+        selectionColor = QtGui.QColor(*self.tileLayout.colorMap['selection'])
+        selection = self.tileLayout.selection
+        rowPitch, columnPitch = self.tileLayout.rowPitch, self.tileLayout.columnPitch
+        verticalSpan, horizontalSpan = self.tileLayout.verticalSpan, self.tileLayout.horizontalSpan
+        tiles = self.tileLayout.gridModel.getTilesInArea(fromRow, fromColumn, toRow - fromRow, toColumn - fromColumn)
+        # the area rectangles are computed inline, a repaint of a full grid meets every tile
+        for tile in tiles:
+            painter.fillRect(
+                tile.fromColumn * columnPitch,
+                tile.fromRow * rowPitch,
+                (tile.columnSpan - 1) * columnPitch + horizontalSpan,
+                (tile.rowSpan - 1) * rowPitch + verticalSpan,
+                selectionColor if tile.widget in selection else idleColor,
+            )
+
+    def __paintCells(self, painter, color, fromRow, fromColumn, toRow, toColumn):
+        """paints the empty cells between (fromRow, fromColumn) included and (toRow, toColumn) excluded: the
+        consecutive rows with the same empty cells are painted together, one tiled pixmap per run of empty cells"""
+        if fromRow >= toRow or fromColumn >= toColumn:
+            return
+        pixmap = self.__cellPixmap(color)
+        rowMasks = self.tileLayout.gridModel.occupancyIndex.rowMasks
+        areaBits = ((1 << (toColumn - fromColumn)) - 1) << fromColumn
+        row = fromRow
+        while row < toRow:
+            emptyBits = ~rowMasks[row] & areaBits
+            rowSpan = 1
+            while row + rowSpan < toRow and ~rowMasks[row + rowSpan] & areaBits == emptyBits:
+                rowSpan += 1
+            while emptyBits:
+                column = (emptyBits & -emptyBits).bit_length() - 1
+                # the run is as long as the trailing empty bits from its first column
+                runBits = emptyBits >> column
+                columnSpan = (runBits ^ (runBits + 1)).bit_length() - 1
+                painter.drawTiledPixmap(self.areaRect((row, column), (rowSpan, columnSpan)), pixmap)
+                emptyBits &= ~(((1 << columnSpan) - 1) << column)
+            row += rowSpan
+
+    def __cellPixmap(self, color):
+        """returns a pixmap of a block of cells of the color, the spacing after and under each cell is left
+        transparent, the block is large enough for the tiling to stay cheap"""
+        ratio = self.devicePixelRatioF()
+        size = (
+            self.tileLayout.horizontalSpan,
+            self.tileLayout.verticalSpan,
+            self.tileLayout.columnPitch,
+            self.tileLayout.rowPitch,
+            ratio,
+        )
+        if size != self.cellPixmapSize:
+            self.cellPixmaps = {}
+            self.cellPixmapSize = size
+        if color not in self.cellPixmaps:
+            rowPitch, columnPitch = self.tileLayout.rowPitch, self.tileLayout.columnPitch
+            rowNumber, columnNumber = -(-128 // rowPitch), -(-128 // columnPitch)
+            pixmap = QtGui.QPixmap(QSize(columnNumber * columnPitch, rowNumber * rowPitch) * ratio)
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.transparent)
+            painter = QtGui.QPainter(pixmap)
+            qColor = QtGui.QColor(*color)
+            for row in range(rowNumber):
+                for column in range(columnNumber):
+                    painter.fillRect(
+                        column * columnPitch,
+                        row * rowPitch,
+                        self.tileLayout.horizontalSpan,
+                        self.tileLayout.verticalSpan,
+                        qColor,
+                    )
+            painter.end()
+            self.cellPixmaps[color] = pixmap
+        return self.cellPixmaps[color]
+
+    def __paintPreviewAreas(self, painter):
+        """outlines the preview areas"""
+        pen = QtGui.QPen(QtGui.QColor(*self.tileLayout.colorMap['empty_check']), 2)
+        pen.setJoinStyle(Qt.MiterJoin)
+        painter.setPen(pen)
+        painter.setBrush(Qt.NoBrush)
+        for fromTile, toTile in self.previewAreas:
+            painter.drawRect(self.areaRect(fromTile, toTile).adjusted(1, 1, -1, -1))
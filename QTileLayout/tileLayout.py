@@ -1,10 +1,25 @@
+from collections.abc import KeysView
+from contextlib import ExitStack, contextmanager
 from PyQt5 import QtWidgets, QtCore, QtGui
-from PyQt5.QtCore import QRect
-from PyQt5.QtGui import QPalette
+from PyQt5.QtCore import QPoint, QRect
 from PyQt5.QtWidgets import QWidget
+import json
 import uuid
-
+import weakref
+
+from .dragSession import DragSession
+from .editHistory import EditHistory
+from .gridModel import GridModel
+from .layoutStats import LayoutStats, measured
+from .lazyWidget import LazyWidget
+from .linkHub import LinkHub
+from .mouseDispatcher import MouseDispatcher
+from .occupancyIndex import OccupancyIndex
+from .resizeSession import ResizeSession
 from .tile import Tile
+from .tileBackground import TileBackground
+from .tileRegistry import TileRegistry
+from .widgetCache import WidgetCache
 
 
 class QTileLayout(QtWidgets.QGridLayout):
@@ -14,6 +29,14 @@ class QTileLayout(QtWidgets.QGridLayout):
 
     tileResized = QtCore.pyqtSignal(QWidget, int, int, int, int)
     tileMoved = QtCore.pyqtSignal(QWidget, str, str, int, int, int, int)
+    operationMeasured = QtCore.pyqtSignal(str, float, int)
+    tilesRearranged = QtCore.pyqtSignal(list)
+    selectionChanged = QtCore.pyqtSignal()
+    hibernated = QtCore.pyqtSignal(QWidget)
+    awakened = QtCore.pyqtSignal(QWidget)
+
+    # version of the format written by saveState
+    stateVersion = 1
 
     def __init__(self, rowNumber, columnNumber, verticalSpan, horizontalSpan, verticalSpacing=5, horizontalSpacing=5,
                  *args, **kwargs):
@@ -28,76 +51,291 @@ class QTileLayout(QtWidgets.QGridLayout):
         self.horizontalSpan = horizontalSpan
         self.minVerticalSpan = verticalSpan
         self.minHorizontalSpan = horizontalSpan
+        # distance between the tops of two consecutive rows and the lefts of two consecutive columns
+        self.rowPitch = verticalSpan + verticalSpacing
+        self.columnPitch = horizontalSpan + horizontalSpacing
 
         # logic parameters
         self.dragAndDrop = True
         self.resizable = True
         self.focus = False
         self.widgetToDrop = None
-        self.tileMap = []
-        self.widgetTileCouple = {'widget': [], 'tile': []}
+        # the geometry of the grid, the layout only applies its changes to the tiles
+        self.gridModel = GridModel(rowNumber, columnNumber)
+        self.tileRegistry = TileRegistry()
+        self.selection = {}
+        self.tilePool = []
+        self.tilePoolSize = 32
+        self.widgetCache = WidgetCache()
+        self.updateDepth = 0
+        self.pendingTileMoved = {}
+        self.pendingTileResized = {}
+        self.pendingTilesRearranged = {}
+        self.editHistory = EditHistory()
+        # the changes of the edit being recorded, by widget, or None out of an edit
+        self.editChanges = None
+        # the watched widgets are often the parent widget or its ancestors, strong references would make cycles through
+        # Qt and let the garbage collector clear the layout while they still send it their events
+        self.resizeSourceRef = None
+        self.pendingSize = None
+        self.resizeTimer = QtCore.QTimer(self)
+        self.resizeTimer.setSingleShot(True)
+        self.resizeTimer.timeout.connect(self.__applyPendingSize)
+        self.viewportRef = None
+        self.hibernationMargin = 0
+        self.awakeWidgets = {}
+        self.hibernatedWidgets = {}
+        self.hibernationTimer = QtCore.QTimer(self)
+        self.hibernationTimer.setSingleShot(True)
+        self.hibernationTimer.timeout.connect(self.__updateHibernation)
+        self.gravity = None
+        self.gravityPending = False
+        self.pushMode = None
+        self.unboundedRows = False
+        self.layoutStats = None
         self.id = str(uuid.uuid4())
-        self.linkedLayout = {self.id: self}
+        self.linkHub = LinkHub(self)
+        self.mouseDispatcher = MouseDispatcher(self)
 
         # design parameters
         self.cursorIdle = QtCore.Qt.ArrowCursor
         self.cursorGrab = QtCore.Qt.OpenHandCursor
         self.cursorResizeHorizontal = QtCore.Qt.SizeHorCursor
         self.cursorResizeVertical = QtCore.Qt.SizeVerCursor
+        self.dragPreview = 'widget'
+        self.dragPreviewScale = 0.5
         self.colorMap = {
             'drag_and_drop': (211, 211, 211),
             'idle': (240, 240, 240),
             'resize': (211, 211, 211),
             'empty_check': (150, 150, 150),
+            'selection': (173, 216, 230),
         }
 
+        self.background = TileBackground(self)
         self.setRowStretch(self.rowNumber, 1)
         self.setColumnStretch(self.columnNumber, 1)
-        self.__createTileMap()
+        self.__createGrid()
 
+    @measured('addWidget')
     def addWidget(self, widget: QWidget, fromRow: int, fromColumn: int, rowSpan: int = 1, columnSpan: int = 1):
         """adds a widget in the layout: works like the addWidget method in a gridLayout"""
-        assert widget not in self.widgetTileCouple['widget']
+        assert widget not in self.tileRegistry
         assert self.isAreaEmpty(fromRow, fromColumn, rowSpan, columnSpan)
-
-        tile = self.tileMap[fromRow][fromColumn]
-        self.widgetTileCouple['widget'].append(widget)
-        self.widgetTileCouple['tile'].append(tile)
-
-        # if the widget is on more than 1 tile, the tiles must be merged
-        if rowSpan > 1 or columnSpan > 1:
-            tilesToMerge = [
-                (fromRow + row, fromColumn + column)
-                for row in range(rowSpan)
-                for column in range(columnSpan)
-            ]
-            self.__mergeTiles(tile, fromRow, fromColumn, rowSpan, columnSpan, tilesToMerge[1:])
-
-        widget.setMouseTracking(True)
-        tile.addWidget(widget)
-
+        self.__placeWidget(widget, fromRow, fromColumn, rowSpan, columnSpan)
+        self.__applyGravity()
+
+    def addWidgetFactory(self, factory, fromRow: int, fromColumn: int, rowSpan: int = 1,
+                         columnSpan: int = 1) -> QWidget:
+        """Reserves the area for the widget returned by factory, which is only called once the tile is in view.
+        Returns the placeholder standing for the widget in the layout"""
+        lazyWidget = LazyWidget(factory)
+        self.addWidget(lazyWidget, fromRow, fromColumn, rowSpan, columnSpan)
+        return lazyWidget
+
+    def autoPlace(self, widget: QWidget, rowSpan: int = 1, columnSpan: int = 1) -> bool:
+        """Adds the widget in the first empty area, row by row, returns False if there is none"""
+        cell = self.gridModel.occupancyIndex.firstFit(rowSpan, columnSpan)
+        if cell is None:
+            return False
+        self.addWidget(widget, cell[0], cell[1], rowSpan, columnSpan)
+        return True
+
+    def addWidgets(self, placements: list):
+        """adds several widgets in one batch, each placement is (widget, fromRow, fromColumn[, rowSpan, columnSpan])"""
+        placements = [(tuple(placement) + (1, 1))[:5] for placement in placements]
+
+        # all the placements are checked before the layout is modified
+        occupancyIndex = self.gridModel.occupancyIndex.copy()
+        widgets = set()
+        for widget, fromRow, fromColumn, rowSpan, columnSpan in placements:
+            assert widget not in self.tileRegistry and widget not in widgets
+            assert occupancyIndex.isAreaInside(fromRow, fromColumn, rowSpan, columnSpan)
+            assert occupancyIndex.isAreaEmpty(fromRow, fromColumn, rowSpan, columnSpan)
+            occupancyIndex.growRows(fromRow + rowSpan)
+            occupancyIndex.fill(fromRow, fromColumn, rowSpan, columnSpan)
+            widgets.add(widget)
+
+        with self.batchUpdate():
+            for placement in placements:
+                self.__placeWidget(*placement)
+        self.__applyGravity()
+
+    def beginUpdate(self):
+        """starts a batch of changes: the geometry is computed and the signals are emitted once at endUpdate"""
+        if self.updateDepth == 0:
+            self.setEnabled(False)
+        self.updateDepth += 1
+
+    def endUpdate(self):
+        """ends a batch of changes: relayouts once and emits one signal per moved or resized widget"""
+        assert self.updateDepth > 0
+        if self.updateDepth == 1 and self.gravityPending:
+            # the compaction is still part of the batch
+            self.gravityPending = False
+            self.__compact(self.gravity)
+        self.updateDepth -= 1
+        if self.updateDepth > 0:
+            return
+
+        self.setEnabled(True)
+        self.invalidate()
+        self.background.update()
+
+        tileMoved, self.pendingTileMoved = self.pendingTileMoved, {}
+        tileResized, self.pendingTileResized = self.pendingTileResized, {}
+        tilesRearranged, self.pendingTilesRearranged = self.pendingTilesRearranged, {}
+        for args in tileMoved.values():
+            self.tileMoved.emit(*args)
+        for args in tileResized.values():
+            self.tileResized.emit(*args)
+        if tilesRearranged:
+            self.tilesRearranged.emit([(widget,) + area for widget, area in tilesRearranged.items()])
+
+    @contextmanager
+    def batchUpdate(self):
+        """context manager calling beginUpdate and endUpdate"""
+        self.beginUpdate()
+        try:
+            yield self
+        finally:
+            self.endUpdate()
+
+    @measured('removeWidget')
     def removeWidget(self, widget: QWidget):
         """removes the given widget"""
-        assert widget in self.widgetTileCouple['widget']
-
-        index = self.widgetTileCouple['widget'].index(widget)
-        tile = self.widgetTileCouple['tile'][index]
-
-        fromRow = tile.getFromRow()
-        fromColumn = tile.getFromColumn()
-        rowSpan = tile.getRowSpan()
-        columnSpan = tile.getColumnSpan()
-        tilesToSplit = [
-            (fromRow + row, fromColumn + column)
-            for row in range(rowSpan)
-            for column in range(columnSpan)
-        ]
-
-        widget.setMouseTracking(False)
-        self.hardSplitTiles(fromRow, fromColumn, tilesToSplit)
-        self.widgetTileCouple['widget'].pop(index)
-        self.widgetTileCouple['tile'].pop(index)
+        assert widget in self.tileRegistry
+        self.__takeWidget(widget)
         self.changeTilesColor('idle')
+        self.__applyGravity()
+
+    def moveWidgets(self, widgets: list, rowDelta: int, columnDelta: int) -> bool:
+        """Moves the widgets together by (rowDelta, columnDelta) cells, returns False if they do not fit"""
+        tiles = [self.tileRegistry.getTile(widget) for widget in dict.fromkeys(widgets)]
+        areas = [
+            (tile.getFromRow() + rowDelta, tile.getFromColumn() + columnDelta, tile.getRowSpan(), tile.getColumnSpan())
+            for tile in tiles
+        ]
+        with self.__recordEdit():
+            if not self.__rearrangeTiles(tiles, areas):
+                return False
+            self.__applyGravity()
+        return True
+
+    def resizeWidgets(self, widgets: list, rowSpanDelta: int, columnSpanDelta: int) -> bool:
+        """Changes the spans of the widgets together by (rowSpanDelta, columnSpanDelta), returns False if they do
+        not fit"""
+        tiles = [self.tileRegistry.getTile(widget) for widget in dict.fromkeys(widgets)]
+        areas = [
+            (tile.getFromRow(), tile.getFromColumn(), tile.getRowSpan() + rowSpanDelta,
+             tile.getColumnSpan() + columnSpanDelta)
+            for tile in tiles
+        ]
+        with self.__recordEdit():
+            if not self.__rearrangeTiles(tiles, areas):
+                return False
+            self.__applyGravity()
+        return True
+
+    @measured('compact')
+    def compact(self, direction: tuple = (0, -1)) -> bool:
+        """Pushes every tile as far as possible in the direction (dirX, dirY), north by default, returns True if
+        tiles were moved"""
+        with self.__recordEdit():
+            return self.__compact(direction)
+
+    def setPushMode(self, direction):
+        """Makes a tile dropped on other ones push them down (0, 1) or right (1, 0), or be refused if direction is
+        None"""
+        assert direction in (None, (0, 1), (1, 0))
+        self.pushMode = direction
+
+    def setUnboundedRows(self, value: bool):
+        """Lets the widgets be added past the last row, the rows are then added as needed"""
+        self.unboundedRows = value
+        self.gridModel.setUnboundedRows(value)
+
+    def setGravity(self, direction):
+        """Compacts the layout in the direction (dirX, dirY) after each change, or never if direction is None"""
+        self.gravity = direction
+        if direction is not None:
+            self.compact(direction)
+
+    def selectWidget(self, widget: QWidget, selected: bool = True):
+        """Adds the widget to the selection or removes it"""
+        assert widget in self.tileRegistry
+        if selected == (widget in self.selection):
+            return
+        if selected:
+            self.selection[widget] = None
+        else:
+            self.selection.pop(widget)
+        self.__repaintTile(self.tileRegistry.getTile(widget))
+        self.selectionChanged.emit()
+
+    def selectArea(self, area, add: bool = False):
+        """Selects the widgets intersecting the area, a QRect of the parent widget or a cell range, see
+        widgetsIntersecting"""
+        widgets = self.widgetsIntersecting(area)
+        if not add:
+            self.clearSelection()
+        for widget in widgets:
+            self.selectWidget(widget)
+
+    def clearSelection(self):
+        """Unselects all the widgets"""
+        if not self.selection:
+            return
+        selection, self.selection = self.selection, {}
+        for widget in selection:
+            self.__repaintTile(self.tileRegistry.getTile(widget))
+        self.selectionChanged.emit()
+
+    def selectedWidgets(self) -> list:
+        """Returns the selected widgets, in the order they were selected"""
+        return list(self.selection)
+
+    def undo(self) -> bool:
+        """Undoes the last move or resize, a widget dropped from a linked layout goes back there. Returns False if
+        there is nothing to undo or if the widgets were changed since, the edit is then forgotten"""
+        if not self.editHistory.canUndo():
+            return False
+        edit = self.editHistory.popUndo()
+        if not self.__applyEdit([
+            (widget, toLayoutId, toArea, fromLayoutId, fromArea)
+            for widget, fromLayoutId, fromArea, toLayoutId, toArea in edit
+        ]):
+            return False
+        self.editHistory.pushRedo(edit)
+        return True
+
+    def redo(self) -> bool:
+        """Redoes the last undone edit, returns False if there is nothing to redo or if the widgets were changed
+        since, the edit is then forgotten"""
+        if not self.editHistory.canRedo():
+            return False
+        edit = self.editHistory.popRedo()
+        if not self.__applyEdit(edit):
+            return False
+        self.editHistory.pushUndo(edit)
+        return True
+
+    def canUndo(self) -> bool:
+        """Returns True if there is an edit to undo"""
+        return self.editHistory.canUndo()
+
+    def canRedo(self) -> bool:
+        """Returns True if there is an undone edit to redo"""
+        return self.editHistory.canRedo()
+
+    def setHistoryDepth(self, depth: int):
+        """Sets how many edits can be undone, 100 by default, 0 disables the history"""
+        assert depth >= 0
+        self.editHistory.setDepth(depth)
+
+    def clearHistory(self):
+        """Forgets the edits to undo and redo"""
+        self.editHistory.clear()
 
     def addRows(self, rowNumber: int):
         """adds rows at the bottom of the layout"""
@@ -105,79 +343,128 @@ class QTileLayout(QtWidgets.QGridLayout):
         self.setRowStretch(self.rowNumber, 0)
 
         for row in range(self.rowNumber, self.rowNumber + rowNumber):
-            self.tileMap.append([])
-            for column in range(self.columnNumber):
-                tile = self.__createTile(row, column)
-                self.tileMap[-1].append(tile)
+            self.setRowMinimumHeight(row, self.verticalSpan)
 
         self.rowNumber += rowNumber
+        self.gridModel.addRows(rowNumber)
         self.setRowStretch(self.rowNumber, 1)
+        self.__updateBackground()
 
     def addColumns(self, columnNumber: int):
         """adds columns at the right of the layout"""
         assert columnNumber > 0
         self.setColumnStretch(self.columnNumber, 0)
 
-        for row in range(self.rowNumber):
-            for column in range(self.columnNumber, self.columnNumber + columnNumber):
-                tile = self.__createTile(row, column)
-                self.tileMap[row].append(tile)
+        for column in range(self.columnNumber, self.columnNumber + columnNumber):
+            self.setColumnMinimumWidth(column, self.horizontalSpan)
 
         self.columnNumber += columnNumber
+        self.gridModel.addColumns(columnNumber)
         self.setColumnStretch(self.columnNumber, 1)
+        self.__updateBackground()
 
     def removeRows(self, rowNumber: int):
         """removes rows from the layout bottom"""
         assert self.isAreaEmpty(self.rowNumber - rowNumber, 0, rowNumber, self.columnNumber)
 
         for row in range(self.rowNumber - rowNumber, self.rowNumber):
-            for column in range(self.columnNumber):
-                super().removeWidget(self.tileMap[row][column])
-                self.tileMap[row][column].deleteLater()
             self.setRowMinimumHeight(row, 0)
             self.setRowStretch(row, 0)
 
         self.rowNumber -= rowNumber
-        self.tileMap = self.tileMap[:self.rowNumber]
+        self.gridModel.removeRows(rowNumber)
+        self.__updateBackground()
 
     def removeColumns(self, columnNumber: int):
         """removes columns from the layout right"""
         assert self.isAreaEmpty(0, self.columnNumber - columnNumber, self.rowNumber, columnNumber)
 
         for column in range(self.columnNumber - columnNumber, self.columnNumber):
-            for row in range(self.rowNumber):
-                super().removeWidget(self.tileMap[row][column])
-                self.tileMap[row][column].deleteLater()
-
             self.setColumnMinimumWidth(column, 0)
             self.setColumnStretch(column, 0)
 
         self.columnNumber -= columnNumber
-        self.tileMap = [row[:self.columnNumber] for row in self.tileMap]
+        self.gridModel.removeColumns(columnNumber)
+        self.__updateBackground()
+
+    def insertRows(self, at: int, rowNumber: int):
+        """inserts empty rows before the row at, the widgets below move down and the ones across are stretched"""
+        assert 0 <= at <= self.rowNumber and rowNumber > 0
+        # only the tiles reaching the row at are touched
+        tiles, areas = self.gridModel.getRowInsertionPlan(at, rowNumber)
+        with self.batchUpdate():
+            self.addRows(rowNumber)
+            if tiles:
+                self.__rearrangeTiles(tiles, areas)
+
+    def insertColumns(self, at: int, columnNumber: int):
+        """inserts empty columns before the column at, the widgets on the right move and the ones across are
+        stretched"""
+        assert 0 <= at <= self.columnNumber and columnNumber > 0
+        tiles, areas = self.gridModel.getColumnInsertionPlan(at, columnNumber)
+        with self.batchUpdate():
+            self.addColumns(columnNumber)
+            if tiles:
+                self.__rearrangeTiles(tiles, areas)
+
+    def deleteRows(self, at: int, rowNumber: int):
+        """deletes rows from the row at, the widgets below move up and the ones across are shrunk, raises an error
+        if a widget is entirely in the deleted rows"""
+        assert 0 <= at and rowNumber > 0 and at + rowNumber <= self.rowNumber
+        plan = self.gridModel.getRowDeletionPlan(at, rowNumber)
+        assert plan is not None
+        with self.batchUpdate():
+            if plan[0]:
+                self.__rearrangeTiles(*plan)
+            self.removeRows(rowNumber)
+
+    def deleteColumns(self, at: int, columnNumber: int):
+        """deletes columns from the column at, the widgets on the right move and the ones across are shrunk, raises
+        an error if a widget is entirely in the deleted columns"""
+        assert 0 <= at and columnNumber > 0 and at + columnNumber <= self.columnNumber
+        plan = self.gridModel.getColumnDeletionPlan(at, columnNumber)
+        assert plan is not None
+        with self.batchUpdate():
+            if plan[0]:
+                self.__rearrangeTiles(*plan)
+            self.removeColumns(columnNumber)
 
     def acceptDragAndDrop(self, value: bool):
         """is the user allowed to drag and drop tiles ?"""
         self.dragAndDrop = value
+        self.mouseDispatcher.forget()
 
     def acceptResizing(self, value: bool):
         """is the user allowed to resize tiles ?"""
         self.resizable = value
+        self.mouseDispatcher.forget()
 
     def setCursorIdle(self, value: QtCore.Qt.CursorShape):
         """the default cursor shape on the tiles"""
         self.cursorIdle = value
+        self.mouseDispatcher.forget()
 
     def setCursorGrab(self, value: QtCore.Qt.CursorShape):
         """the cursor shape when the user can grab the tile"""
         self.cursorGrab = value
+        self.mouseDispatcher.forget()
 
     def setCursorResizeHorizontal(self, value: QtCore.Qt.CursorShape):
         """the cursor shape when the user can resize the tile horizontally"""
         self.cursorResizeHorizontal = value
+        self.mouseDispatcher.forget()
 
     def setCursorResizeVertical(self, value: QtCore.Qt.CursorShape):
         """the cursor shape when the user can resize the tile vertically"""
         self.cursorResizeVertical = value
+        self.mouseDispatcher.forget()
+
+    def setDragPreview(self, preview: str, scale: float = 0.5):
+        """the pixmap under the cursor during drag and drop: 'widget', 'scaled' or 'placeholder'"""
+        assert preview in ('widget', 'scaled', 'placeholder')
+        assert scale > 0
+        self.dragPreview = preview
+        self.dragPreviewScale = scale
 
     def setColorIdle(self, color: tuple):
         """the default tile color"""
@@ -196,6 +483,12 @@ class QTileLayout(QtWidgets.QGridLayout):
         """the tile color, if empty, during drag and drop"""
         self.colorMap['empty_check'] = color
 
+    def setColorSelection(self, color: tuple):
+        """the color of the selected tiles"""
+        self.colorMap['selection'] = color
+        for widget in self.selection:
+            self.__repaintTile(self.tileRegistry.getTile(widget))
+
     def rowCount(self) -> int:
         """Returns the number of rows"""
         return self.rowNumber
@@ -206,7 +499,50 @@ class QTileLayout(QtWidgets.QGridLayout):
 
     def tileRect(self, row: int, column: int) -> QRect:
         """Returns the geometry of the tile at (row, column)"""
-        return self.tileMap[row][column].rect()
+        tile = self.gridModel.tileAt(row, column)
+        if tile is None:
+            return QRect(0, 0, self.horizontalSpan, self.verticalSpan)
+        return tile.rect()
+
+    def cellAt(self, point: QPoint):
+        """Returns the (row, column) of the cell under the point of the parent widget, or None outside the grid"""
+        if not self.background.geometry().contains(point):
+            return None
+        point = point - self.background.pos()
+        return self.background.cellAt(point.x(), point.y())
+
+    def widgetAt(self, row: int, column: int):
+        """Returns the widget covering the cell (row, column), or None if the cell is empty"""
+        tile = self.gridModel.tileAt(row, column)
+        if tile is None:
+            return None
+        return self.tileRegistry.getWidget(tile)
+
+    def widgetsIntersecting(self, area) -> list:
+        """Returns the widgets intersecting a QRect of the parent widget or a (fromRow, fromColumn, rowSpan,
+        columnSpan) cell range"""
+        if not isinstance(area, QRect):
+            return [self.tileRegistry.getWidget(tile) for tile in self.gridModel.getTilesInArea(*area)]
+
+        rect = area.intersected(self.background.geometry())
+        if rect.isEmpty():
+            return []
+        fromRow, fromColumn = self.cellAt(rect.topLeft())
+        toRow, toColumn = self.cellAt(rect.bottomRight())
+        tiles = self.gridModel.getTilesInArea(fromRow, fromColumn, toRow - fromRow + 1, toColumn - fromColumn + 1)
+        # a rectangle ending in the spacing after a cell selects the cell but not always its widget
+        return [
+            self.tileRegistry.getWidget(tile)
+            for tile in tiles
+            if self.geometryOf(self.tileRegistry.getWidget(tile)).intersects(rect)
+        ]
+
+    def geometryOf(self, widget: QWidget) -> QRect:
+        """Returns the geometry of the tile holding the widget in the parent widget"""
+        tile = self.tileRegistry.getTile(widget)
+        return self.background.areaRect(
+            (tile.getFromRow(), tile.getFromColumn()), (tile.getRowSpan(), tile.getColumnSpan())
+        ).translated(self.background.pos())
 
     def rowsMinimumHeight(self) -> int:
         """Returns the minimum height"""
@@ -260,84 +596,292 @@ class QTileLayout(QtWidgets.QGridLayout):
         """Activates or not the widget focus after drag & drop or resize"""
         self.focus = focus
 
-    def widgetList(self) -> list:
-        """Returns the widgets currently in the layout"""
-        return self.widgetTileCouple['widget']
+    def widgetList(self) -> KeysView:
+        """Returns a read-only view of the widgets currently in the layout"""
+        return self.tileRegistry.widgetList()
+
+    def saveState(self, widgetKey=None) -> bytes:
+        """Returns the layout state, each widget is saved under the key returned by widgetKey(widget)"""
+        if widgetKey is None:
+            widgetKey = QWidget.objectName
+
+        state = {
+            'version': self.stateVersion,
+            'grid': [self.rowNumber, self.columnNumber],
+            'span': [self.verticalSpan, self.horizontalSpan],
+            'minSpan': [self.minVerticalSpan, self.minHorizontalSpan],
+            'spacing': [self.verticalSpacing(), self.horizontalSpacing()],
+            'colors': self.colorMap,
+            'tiles': [
+                [widgetKey(widget), tile.getFromRow(), tile.getFromColumn(), tile.getRowSpan(), tile.getColumnSpan()]
+                for widget, tile in self.tileRegistry.couples()
+            ],
+        }
+        return json.dumps(state, separators=(',', ':')).encode()
+
+    def restoreState(self, state: bytes, widgetFromKey) -> bool:
+        """Restores a state returned by saveState, widgetFromKey(key) returns the widget to place or None to skip it"""
+        state = self.__readState(state)
+        if state is None:
+            return False
+
+        placements = []
+        for key, fromRow, fromColumn, rowSpan, columnSpan in state['tiles']:
+            widget = widgetFromKey(key)
+            if widget is not None:
+                placements.append((widget, fromRow, fromColumn, rowSpan, columnSpan))
+
+        # the placements are checked on the saved grid before the layout is emptied
+        rowNumber, columnNumber = state['grid']
+        occupancyIndex = OccupancyIndex(rowNumber, columnNumber)
+        occupancyIndex.unboundedRows = self.unboundedRows
+        widgets = set()
+        for widget, fromRow, fromColumn, rowSpan, columnSpan in placements:
+            if (
+                widget in widgets
+                or rowSpan < 1 or columnSpan < 1
+                or not occupancyIndex.isAreaInside(fromRow, fromColumn, rowSpan, columnSpan)
+                or not occupancyIndex.isAreaEmpty(fromRow, fromColumn, rowSpan, columnSpan)
+            ):
+                return False
+            occupancyIndex.growRows(fromRow + rowSpan)
+            occupancyIndex.fill(fromRow, fromColumn, rowSpan, columnSpan)
+            widgets.add(widget)
+
+        # the released tiles are all kept to hold the restored widgets, instead of being deleted and created again
+        tilePoolSize, self.tilePoolSize = self.tilePoolSize, max(self.tilePoolSize, len(self.tileRegistry))
+        try:
+            with self.batchUpdate():
+                self.__removeAllWidgets()
+
+                if rowNumber > self.rowNumber:
+                    self.addRows(rowNumber - self.rowNumber)
+                elif rowNumber < self.rowNumber:
+                    self.removeRows(self.rowNumber - rowNumber)
+                if columnNumber > self.columnNumber:
+                    self.addColumns(columnNumber - self.columnNumber)
+                elif columnNumber < self.columnNumber:
+                    self.removeColumns(self.columnNumber - columnNumber)
+
+                self.verticalSpan, self.horizontalSpan = state['span']
+                self.minVerticalSpan, self.minHorizontalSpan = state['minSpan']
+                super().setVerticalSpacing(state['spacing'][0])
+                super().setHorizontalSpacing(state['spacing'][1])
+                self.colorMap.update({key: tuple(color) for key, color in state['colors'].items()})
+                self.__updateAllTiles()
+
+                self.addWidgets(placements)
+                self.changeTilesColor('idle')
+        finally:
+            self.setTilePoolSize(tilePoolSize)
+        return True
 
     def linkLayout(self, layout: QtWidgets.QLayout):
         """Links this layout with another one to allow drag and drop between them"""
         assert isinstance(layout, QTileLayout)
-        assert layout.id not in self.linkedLayout
-        assert self.id not in layout.linkedLayout
-        self.linkedLayout[layout.id] = layout
-        layout.linkedLayout[self.id] = self
+        assert not self.linkHub.isLinked(self.id, layout.id)
+        self.linkHub.link(self, layout)
 
     def unLinkLayout(self, layout: QtWidgets.QLayout):
         """Unlinks this layout with another one to forbid drag and drop between them"""
         assert isinstance(layout, QTileLayout)
         assert layout.id != self.id
-        assert layout.id in self.linkedLayout
-        assert self.id in layout.linkedLayout
-        self.linkedLayout.pop(layout.id)
-        layout.linkedLayout.pop(self.id)
+        assert self.linkHub.isLinked(self.id, layout.id)
+        self.linkHub.unlink(self, layout)
 
+    @measured('highlightTiles')
     def highlightTiles(self, direction, fromRow, fromColumn, tileNumber):
         """highlights tiles that will be merged during resizing"""
-        tile = self.tileMap[fromRow][fromColumn]
-        tilesToMerge, increase, fromRow, fromColumn, rowSpan, columnSpan = self.__getTilesToBeResized(
-            tile, direction, fromRow, fromColumn, tileNumber
-        )
+        cells, increase, area = self.gridModel.getResizePlan(direction, fromRow, fromColumn, tileNumber)
 
-        if tilesToMerge:
+        if cells:
+            (fromRow, fromColumn, rowSpan, columnSpan) = area
             self.changeTilesColor('empty_check', (fromRow, fromColumn), (rowSpan, columnSpan))
 
+    @measured('resizeTile')
     def resizeTile(self, direction, fromRow, fromColumn, tileNumber):
         """called when a tile is resized"""
-        tile = self.tileMap[fromRow][fromColumn]
-        tilesToMerge, increase, fromRow, fromColumn, rowSpan, columnSpan = self.__getTilesToBeResized(
-            tile, direction, fromRow, fromColumn, tileNumber
-        )
+        tile = self.gridModel.tileAt(fromRow, fromColumn)
+        cells, increase, area = self.gridModel.getResizePlan(direction, fromRow, fromColumn, tileNumber)
 
-        if tilesToMerge:
-            if increase:
-                self.__mergeTiles(tile, fromRow, fromColumn, rowSpan, columnSpan, tilesToMerge)
+        with self.__recordEdit():
+            if cells:
+                if increase:
+                    self.__mergeTiles(tile, area, cells)
+                else:
+                    self.__splitTiles(tile, area, cells)
+                widget = self.tileRegistry.getWidget(tile)
+                self.__notifyTileResized(widget, *area)
+            self.__applyGravity()
+
+    def beginResize(self, direction, fromRow, fromColumn) -> ResizeSession:
+        """starts resizing the tile at (fromRow, fromColumn), the empty space next to it is measured only here"""
+        tile = self.gridModel.tileAt(fromRow, fromColumn)
+        maxGrowth = self.gridModel.occupancyIndex.freeSpace(
+            direction, tile.getFromRow(), tile.getFromColumn(), tile.getRowSpan(), tile.getColumnSpan()
+        )
+        self.changeTilesColor('resize')
+        return ResizeSession(tile, direction, maxGrowth)
+
+    @measured('highlightTiles')
+    def previewResize(self, session: ResizeSession, tileNumber):
+        """highlights the tile resized by tileNumber cells, only the cells whose color changes are repainted"""
+        area = session.area(tileNumber)
+        if area == session.previewArea:
+            return
+        session.previewArea = area
+        (fromRow, fromColumn, rowSpan, columnSpan) = area
+        self.background.replaceHighlight('empty_check', (fromRow, fromColumn), (rowSpan, columnSpan))
+
+    @measured('resizeTile')
+    def endResize(self, session: ResizeSession, tileNumber):
+        """resizes the tile by tileNumber cells with the plan of the session"""
+        area = session.area(tileNumber)
+        self.changeTilesColor('idle')
+        if area == session.area(0):
+            return
+
+        (fromRow, fromColumn, rowSpan, columnSpan) = area
+        cells = session.cells(area)
+        with self.__recordEdit():
+            if rowSpan * columnSpan > session.rowSpan * session.columnSpan:
+                self.__mergeTiles(session.tile, area, cells)
             else:
-                self.__splitTiles(tile, fromRow, fromColumn, rowSpan, columnSpan, tilesToMerge)
-            index = self.widgetTileCouple['tile'].index(tile)
-            widget = self.widgetTileCouple['widget'][index]
-            self.tileResized.emit(widget, fromRow, fromColumn, rowSpan, columnSpan)
+                self.__splitTiles(session.tile, area, cells)
+            widget = self.tileRegistry.getWidget(session.tile)
+            self.__notifyTileResized(widget, fromRow, fromColumn, rowSpan, columnSpan)
+            self.__applyGravity()
 
     def hardSplitTiles(self, fromRow, fromColumn, tilesToSplit):
-        """splits the tiles and return the new one at (fromRow, fromColumn)"""
+        """frees the tilesToSplit cells and removes the tiles that were covering them"""
         assert (fromRow, fromColumn) in tilesToSplit
-        tilesToRecycle = set()
-
-        for row, column in tilesToSplit:
-            tilesToRecycle.add(self.tileMap[row][column])
-            self.__createTile(row, column, updateTileMap=True)
+        tilesToRecycle = {self.gridModel.tileAt(row, column) for row, column in tilesToSplit}
+        tilesToRecycle.discard(None)
 
         for tile in tilesToRecycle:
-            super().removeWidget(tile)
-            tile.deleteLater()
-
-        tile = self.tileMap[fromRow][fromColumn]
-        super().addWidget(tile, fromRow, fromColumn)
-        return tile
-
+            self.gridModel.remove(tile)
+            self.__releaseTile(tile)
+
+    def recycleTile(self, tile):
+        """gives back a tile removed during its own drag and drop, once the drag is over"""
+        if tile not in self.tileRegistry.widgets:
+            self.__poolTile(tile)
+
+    def setTilePoolSize(self, size: int):
+        """Sets how many unused tiles are kept to be reused instead of being created again"""
+        assert size >= 0
+        self.tilePoolSize = size
+        self.trimTilePool(size)
+
+    def setFactoryCacheSize(self, size):
+        """Sets how many widgets built by factories are kept, the least recently shown ones out of view are destroyed
+        beyond it and built again when they come back in view. None keeps them all"""
+        assert size is None or size >= 0
+        self.widgetCache.size = size
+        self.widgetCache.trim()
+
+    def trimTilePool(self, size: int = 0):
+        """Deletes the unused tiles beyond the given number"""
+        while len(self.tilePool) > size:
+            self.tilePool.pop().deleteLater()
+
+    @measured('isAreaEmpty')
     def isAreaEmpty(self, fromRow, fromColumn, rowSpan, columnSpan, color=''):
         """checks if the given space is free from widgets"""
         if isinstance(color, str) and color in self.colorMap.keys():
             self.changeTilesColor(color)
-        if ((fromRow + rowSpan > self.rowNumber) or (fromColumn + columnSpan > self.columnNumber) or
-                (fromRow < 0) or (fromColumn < 0)):
-            isEmpty = False
-        else:
-            isEmpty = all([not self.tileMap[fromRow + row][fromColumn + column].isFilled()
-                           for row in range(rowSpan) for column in range(columnSpan)])
+        isEmpty = self.gridModel.isAreaEmpty(fromRow, fromColumn, rowSpan, columnSpan)
         if isEmpty and isinstance(color, str) and color in self.colorMap.keys():
             self.changeTilesColor('empty_check', (fromRow, fromColumn), (rowSpan, columnSpan))
         return isEmpty
 
+    def isDropPossible(self, event, row, column):
+        """checks if the dragged tile can be dropped with the cursor on the cell (row, column)"""
+        session = DragSession.fromMimeData(event.mimeData())
+        if session is None or not self.linkHub.isLinked(session.layoutId, self.id):
+            return False
+        self.linkHub.hover(self)
+        if session.group is not None:
+            return session.layoutId == self.id and self.__isGroupDropPossible(session, row, column)
+
+        if self.isAreaEmpty(
+            row - session.rowOffset,
+            column - session.columnOffset,
+            session.rowSpan,
+            session.columnSpan,
+            color='drag_and_drop'
+        ):
+            return True
+        return self.pushMode is not None and self.__isPushPossible(
+            row - session.rowOffset, column - session.columnOffset, session.rowSpan, session.columnSpan
+        )
+
+    @measured('dropWidget')
+    def dropWidget(self, event, row, column):
+        """drops the dragged tile with the cursor on the cell (row, column)"""
+        session = DragSession.fromMimeData(event.mimeData())
+        if session.group is not None:
+            self.moveWidgets(
+                session.group,
+                row - session.rowOffset - session.fromRow,
+                column - session.columnOffset - session.fromColumn,
+            )
+            return
+        sourceLayout = self.linkHub.getLayout(session.layoutId)
+        widget = sourceLayout.getWidgetToDrop()
+        area = (row - session.rowOffset, column - session.columnOffset, session.rowSpan, session.columnSpan)
+
+        with self.__recordEdit(), self.batchUpdate():
+            if self.pushMode is not None and not self.gridModel.occupancyIndex.isAreaEmpty(*area):
+                # the tiles under the dropped one are pushed away in the same batch
+                self.__rearrangeTiles(*self.gridModel.getPushPlan(self.pushMode, *area))
+            # the widget left its tile when the drag started, its origin is in the session
+            self.__noteEdit(
+                widget,
+                session.layoutId,
+                (session.fromRow, session.fromColumn, session.rowSpan, session.columnSpan),
+                self.id,
+                area,
+            )
+            self.addWidget(widget, *area)
+            # held in the batch, a tile moved again by the gravity keeps its origin
+            self.__notifyTileMoved(
+                widget,
+                session.layoutId,
+                self.id,
+                session.fromRow,
+                session.fromColumn,
+                row - session.rowOffset,
+                column - session.columnOffset,
+            )
+            if sourceLayout is not self:
+                # the gravity of the source was suspended during the drag, its compaction belongs to this edit
+                sourceLayout.editChanges = self.editChanges
+                try:
+                    sourceLayout.__applyGravity()
+                finally:
+                    sourceLayout.editChanges = None
+
+    def setInstrumentation(self, enabled: bool, sampleSize: int = 1024):
+        """Records the count, the durations and the touched tiles of the layout operations, see stats"""
+        if not enabled and self.layoutStats is not None:
+            self.layoutStats.detach(self)
+            self.layoutStats = None
+        elif enabled and self.layoutStats is None:
+            self.layoutStats = LayoutStats(sampleSize, self.operationMeasured.emit)
+            self.layoutStats.attach(self)
+
+    def stats(self) -> dict:
+        """Returns the statistics of each measured operation, durations are in milliseconds"""
+        if self.layoutStats is None:
+            return {}
+        return self.layoutStats.summary()
+
+    def resetStats(self):
+        """Forgets the measured operations"""
+        if self.layoutStats is not None:
+            self.layoutStats.reset()
+
     def getWidgetToDrop(self):
         """gets the widget that the user is dragging"""
         widget = self.widgetToDrop
@@ -348,191 +892,563 @@ class QTileLayout(QtWidgets.QGridLayout):
         """sets the widget that the user is dragging"""
         self.widgetToDrop = widget
 
+    @measured('changeTilesColor')
     def changeTilesColor(self, colorChoice, from_tile=(0, 0), to_tile=None):
-        """changes the color of all tiles"""
-        palette = QPalette()
-        palette.setColor(QPalette.Background, QtGui.QColor(*self.colorMap[colorChoice]))
-        palette_idle = QPalette()
-        palette_idle.setColor(QPalette.Background, QtGui.QColor(*self.colorMap['idle']))
+        """changes the color of the empty cells, the background paints it under all the tiles in one pass"""
         if to_tile is None:
             to_tile = (self.rowNumber, self.columnNumber)
-        for row in range(from_tile[0], from_tile[0] + to_tile[0]):
-            for column in range(from_tile[1], from_tile[1] + to_tile[1]):
-                if not self.tileMap[row][column].isFilled():
-                    self.tileMap[row][column].changeColor(palette)
-                else:
-                    self.tileMap[row][column].changeColor(palette_idle)
+        self.background.changeColor(colorChoice, from_tile, to_tile)
 
     def updateGlobalSize(self, newSize: QtGui.QResizeEvent):
         """update the size of the layout"""
-        verticalMargins = self.contentsMargins().top() + self.contentsMargins().bottom()
-        verticalSpan = int(
-            (newSize.size().height() - (self.rowNumber - 1) * self.verticalSpacing() - verticalMargins)
-            // self.rowNumber
+        self.__updateGlobalSize(newSize.size())
+
+    def setResizeSource(self, widget: QWidget, frameBudget: int = 16):
+        """Fits the tiles to the widget size each time it is resized, at most once every frameBudget milliseconds"""
+        previousSource = self.__resizeSource()
+        self.resizeSourceRef = None if widget is None else weakref.ref(widget)
+        self.__unwatch(previousSource)
+        self.resizeTimer.setInterval(frameBudget)
+        if widget is not None:
+            widget.installEventFilter(self)
+
+    def setHibernation(self, viewport: QWidget, margin: int = 0):
+        """Hibernates the widgets out of the viewport, or wakes them all up if viewport is None"""
+        hibernating, previousViewport = self.viewportRef is not None, self.__viewport()
+        self.viewportRef = None if viewport is None else weakref.ref(viewport)
+        if hibernating:
+            self.__unwatch(previousViewport)
+            self.__unwatch(self.parentWidget())
+        if viewport is None:
+            for widget in list(self.hibernatedWidgets):
+                self.__wakeWidget(widget)
+            self.awakeWidgets = {}
+            return
+
+        assert self.parentWidget() is not None
+        self.hibernationMargin = margin
+        self.awakeWidgets = dict.fromkeys(
+            widget for widget in self.tileRegistry.widgetList() if widget not in self.hibernatedWidgets
+        )
+        # scrolling moves the parent widget in the viewport
+        viewport.installEventFilter(self)
+        self.parentWidget().installEventFilter(self)
+        self.__updateHibernation()
+
+    def isHibernated(self, widget: QWidget) -> bool:
+        """Returns True if the widget is out of view and does not paint"""
+        return widget in self.hibernatedWidgets
+
+    def setGeometry(self, rect: QRect):
+        """lays the tiles out, the widgets in view are then checked again"""
+        super().setGeometry(rect)
+        if self.parentWidget() is not self.mouseDispatcher.widget():
+            self.__watchPointer()
+        if self.viewportRef is not None:
+            self.hibernationTimer.start()
+
+    def eventFilter(self, watched: QtCore.QObject, event: QtCore.QEvent) -> bool:
+        """follows the pointer over the tiles, coalesces the resize events of the resize source and the moves of the
+        viewport content"""
+        if watched is self.mouseDispatcher.widget():
+            if event.type() == QtCore.QEvent.HoverMove:
+                self.mouseDispatcher.hover(event.pos())
+            elif event.type() == QtCore.QEvent.HoverLeave:
+                self.mouseDispatcher.leave()
+            elif event.type() == QtCore.QEvent.ChildRemoved and event.child() is self:
+                # the layout was taken out of the widget, it stops watching it
+                self.mouseDispatcher.setWidget(None)
+                self.__unwatch(watched)
+        if watched is self.__resizeSource() and event.type() == QtCore.QEvent.Resize:
+            self.pendingSize = event.size()
+            if not self.resizeTimer.isActive():
+                self.resizeTimer.start()
+        if (
+            self.viewportRef is not None and watched in (self.__viewport(), self.parentWidget())
+            and event.type() in (QtCore.QEvent.Move, QtCore.QEvent.Resize)
+        ):
+            self.hibernationTimer.start()
+        return super().eventFilter(watched, event)
+
+    def __updateHibernation(self):
+        """hibernates the widgets which left the viewport and wakes up the ones which came back, only the widgets
+        in view and the ones which were awake are checked"""
+        viewport = self.__viewport()
+        if viewport is None or self.parentWidget() is None:
+            return
+        margin = self.hibernationMargin
+        origin = self.parentWidget().mapFromGlobal(viewport.mapToGlobal(QPoint(0, 0)))
+        visibleWidgets = dict.fromkeys(
+            self.widgetsIntersecting(QRect(origin, viewport.size()).adjusted(-margin, -margin, margin, margin))
         )
 
+        for widget in [widget for widget in self.awakeWidgets if widget not in visibleWidgets]:
+            self.__hibernateWidget(widget)
+        for widget in visibleWidgets:
+            if widget in self.hibernatedWidgets:
+                self.__wakeWidget(widget)
+
+    def __hibernateWidget(self, widget):
+        """keeps the last frame of the widget and stops its paints"""
+        tile = self.tileRegistry.getTile(widget)
+        # a placeholder has nothing to show, grabbing it would build its widget
+        if not isinstance(widget, LazyWidget) or widget.isInstantiated():
+            tile.setPixmap(widget.grab())
+        widget.setUpdatesEnabled(False)
+        self.awakeWidgets.pop(widget, None)
+        self.hibernatedWidgets[widget] = None
+        self.hibernated.emit(widget)
+
+    def __wakeWidget(self, widget):
+        """lets the widget paint again, the tile shows its last frame until then"""
+        widget.setUpdatesEnabled(True)
+        if widget in self.tileRegistry:
+            self.tileRegistry.getTile(widget).setPixmap(None)
+            self.awakeWidgets[widget] = None
+        self.hibernatedWidgets.pop(widget)
+        self.awakened.emit(widget)
+
+    def __forgetHibernation(self, widget):
+        """wakes up a widget leaving the layout"""
+        self.awakeWidgets.pop(widget, None)
+        if widget in self.hibernatedWidgets:
+            self.__wakeWidget(widget)
+            self.awakeWidgets.pop(widget, None)
+
+    def __unwatch(self, widget):
+        """removes the event filter from the widget, unless the widget is still watched for another reason"""
+        watchedWidgets = [self.__resizeSource(), self.mouseDispatcher.widget()]
+        if self.viewportRef is not None:
+            watchedWidgets += [self.__viewport(), self.parentWidget()]
+        if widget is not None and widget not in watchedWidgets:
+            widget.removeEventFilter(self)
+
+    def __resizeSource(self):
+        """returns the widget whose size the tiles follow, or None"""
+        return None if self.resizeSourceRef is None else self.resizeSourceRef()
+
+    def __viewport(self):
+        """returns the viewport of the hibernation, or None"""
+        return None if self.viewportRef is None else self.viewportRef()
+
+    def __watchPointer(self):
+        """watches the hover events of the parent widget, they come from its children too, even without mouse
+        tracking"""
+        previousWidget, widget = self.mouseDispatcher.widget(), self.parentWidget()
+        self.mouseDispatcher.setWidget(widget)
+        self.__unwatch(previousWidget)
+        if widget is not None:
+            widget.setAttribute(QtCore.Qt.WA_Hover)
+            widget.installEventFilter(self)
+
+    def __applyPendingSize(self):
+        """fits the tiles to the last size received from the resize source"""
+        if self.pendingSize is not None:
+            self.__updateGlobalSize(self.pendingSize)
+            self.pendingSize = None
+
+    @measured('updateGlobalSize')
+    def __updateGlobalSize(self, size: QtCore.QSize):
+        """fits the tiles to the given size, nothing is done if the tile spans do not change"""
+        verticalMargins = self.contentsMargins().top() + self.contentsMargins().bottom()
+        if self.unboundedRows:
+            # the rows keep their height, the grid gets the rows shown by the size instead
+            verticalSpan = self.verticalSpan
+            self.__growRows((size.height() - verticalMargins + self.verticalSpacing()) // self.rowPitch)
+        else:
+            verticalSpan = int(
+                (size.height() - (self.rowNumber - 1) * self.verticalSpacing() - verticalMargins)
+                // self.rowNumber
+            )
+
         horizontalMargins = self.contentsMargins().left() + self.contentsMargins().right()
         horizontalSpan = int(
-            (newSize.size().width() - (self.columnNumber - 1) * self.horizontalSpacing() - horizontalMargins)
+            (size.width() - (self.columnNumber - 1) * self.horizontalSpacing() - horizontalMargins)
             // self.columnNumber
         )
 
-        self.verticalSpan = max(verticalSpan, self.minVerticalSpan)
-        self.horizontalSpan = max(horizontalSpan, self.minHorizontalSpan)
-        self.__updateAllTiles()
-
-    def __mergeTiles(self, tile, fromRow, fromColumn, rowSpan, columnSpan, tilesToMerge):
-        """merges the tilesToMerge with tile"""
-        for row, column in tilesToMerge:
-            super().removeWidget(self.tileMap[row][column])
-            self.tileMap[row][column].deleteLater()
-            self.tileMap[row][column] = tile
+        verticalSpan = max(verticalSpan, self.minVerticalSpan)
+        horizontalSpan = max(horizontalSpan, self.minHorizontalSpan)
+        if (verticalSpan, horizontalSpan) == (self.verticalSpan, self.horizontalSpan):
+            return
 
-        super().removeWidget(tile)
-        super().addWidget(tile, fromRow, fromColumn, rowSpan, columnSpan)
-        tile.updateSize(fromRow, fromColumn, rowSpan, columnSpan)
-
-    def __splitTiles(self, tile, fromRow, fromColumn, rowSpan, columnSpan, tilesToSplit):
-        """splits the tilesToSplit from tile"""
-        for row, column in tilesToSplit:
-            self.__createTile(row, column, updateTileMap=True)
+        self.verticalSpan = verticalSpan
+        self.horizontalSpan = horizontalSpan
+        self.__updateAllTiles()
 
-        super().removeWidget(tile)
-        super().addWidget(tile, fromRow, fromColumn, rowSpan, columnSpan)
-        tile.updateSize(fromRow, fromColumn, rowSpan, columnSpan)
-
-    def __createTile(self, fromRow, fromColumn, rowSpan=1, columnSpan=1, updateTileMap=False):
-        """creates a tile: a tile is basically a place holder that can contain a widget or not"""
-        tile = Tile(
-            self,
-            fromRow,
-            fromColumn,
-            rowSpan,
-            columnSpan,
-            self.verticalSpan,
-            self.horizontalSpan,
-        )
-        super().addWidget(tile, fromRow, fromColumn, rowSpan, columnSpan)
+    def __readState(self, state):
+        """returns the dictionary saved by saveState, or None if it cannot be read or does not have the expected
+        shape"""
+        try:
+            state = json.loads(state)
+        except ValueError:
+            return None
+        if not isinstance(state, dict) or state.get('version') != self.stateVersion:
+            return None
+
+        def isIntList(value, length, minimum, maximum=None):
+            return isinstance(value, list) and len(value) == length and all(
+                type(item) is int and item >= minimum and (maximum is None or item <= maximum) for item in value
+            )
 
-        if updateTileMap:
-            tilePositions = [
-                (fromRow + row, fromColumn + column)
-                for row in range(rowSpan)
-                for column in range(columnSpan)
-            ]
-            for (row, column) in tilePositions:
-                self.tileMap[row][column] = tile
+        try:
+            isValid = (
+                isIntList(state['grid'], 2, 1)
+                and isIntList(state['span'], 2, 1)
+                and isIntList(state['minSpan'], 2, 1)
+                and isIntList(state['spacing'], 2, 0)
+                and isinstance(state['colors'], dict)
+                and all(key in self.colorMap and isIntList(color, 3, 0, 255) for key, color in state['colors'].items())
+                and isinstance(state['tiles'], list)
+                and all(
+                    isinstance(tile, list) and len(tile) == 5 and isIntList(tile[1:], 4, 0) for tile in state['tiles']
+                )
+            )
+        except KeyError:
+            return None
+        return state if isValid else None
+
+    def __removeAllWidgets(self):
+        """removes all the widgets at once"""
+        self.clearSelection()
+        for widget, tile in self.tileRegistry.couples():
+            if isinstance(widget, LazyWidget):
+                widget.setWidgetCache(None)
+            self.__forgetHibernation(widget)
+            self.__releaseTile(tile)
+
+        self.tileRegistry = TileRegistry()
+        self.gridModel.clear()
+        self.editHistory.clear()
+
+    def __placeWidget(self, widget, fromRow, fromColumn, rowSpan, columnSpan):
+        """puts the widget in a new tile, the area must have been checked"""
+        # only the cells holding a widget are materialized by a tile
+        self.__growRows(fromRow + rowSpan)
+        tile = self.__createTile(fromRow, fromColumn, rowSpan, columnSpan)
+        self.gridModel.place(tile)
+        self.tileRegistry.add(widget, tile)
+
+        if isinstance(widget, LazyWidget):
+            widget.setWidgetCache(self.widgetCache)
+        tile.addWidget(widget)
+        if self.viewportRef is not None:
+            # the widget is hibernated at the next check if it is out of view
+            self.awakeWidgets[widget] = None
+            self.hibernationTimer.start()
 
-        return tile
+    def __takeWidget(self, widget):
+        """takes the widget out of the grid, the other tiles do not move"""
+        tile = self.tileRegistry.getTile(widget)
 
-    def __getTilesToBeResized(self, tile, direction, fromRow, fromColumn, tileNumber):
-        """recovers the tiles that will be merged or split during resizing"""
+        fromRow = tile.getFromRow()
+        fromColumn = tile.getFromColumn()
         rowSpan = tile.getRowSpan()
         columnSpan = tile.getColumnSpan()
-        increase = True
-        (dirX, dirY) = direction
+        tilesToSplit = [
+            (fromRow + row, fromColumn + column)
+            for row in range(rowSpan)
+            for column in range(columnSpan)
+        ]
 
-        # increase tile size
-        if tileNumber * (dirX + dirY) > 0:
-            tileNumber, tilesToMerge = self.__getTilesToMerge(direction, fromRow, fromColumn, tileNumber)
-        # decrease tile size
+        if isinstance(widget, LazyWidget):
+            widget.setWidgetCache(None)
+        self.__forgetHibernation(widget)
+        self.hardSplitTiles(fromRow, fromColumn, tilesToSplit)
+        self.tileRegistry.remove(widget)
+        self.pendingTilesRearranged.pop(widget, None)
+        if widget in self.selection:
+            del self.selection[widget]
+            self.selectionChanged.emit()
+
+    def __growRows(self, toRow):
+        """adds the rows needed to reach the row toRow excluded, only the new rows are set up"""
+        if toRow > self.rowNumber:
+            self.addRows(toRow - self.rowNumber)
+
+    def __compact(self, direction):
+        """moves the tiles where the grid model compacts them"""
+        tiles, areas = self.gridModel.getCompactPlan(direction)
+        return bool(tiles) and self.__rearrangeTiles(tiles, areas)
+
+    def __isPushPossible(self, fromRow, fromColumn, rowSpan, columnSpan):
+        """checks if the tiles under the area can be pushed away, and shows where they would go"""
+        if not self.gridModel.occupancyIndex.isAreaInside(fromRow, fromColumn, rowSpan, columnSpan):
+            return False
+        plan = self.gridModel.getPushPlan(self.pushMode, fromRow, fromColumn, rowSpan, columnSpan)
+        if plan is None:
+            return False
+
+        self.changeTilesColor('empty_check', (fromRow, fromColumn), (rowSpan, columnSpan))
+        self.background.setPreviewAreas([
+            ((areaRow, areaColumn), (areaRowSpan, areaColumnSpan))
+            for areaRow, areaColumn, areaRowSpan, areaColumnSpan in plan[1]
+        ])
+        return True
+
+    def __applyGravity(self):
+        """compacts the layout if gravity is set, at the end of the batch if there is one and not during a drag"""
+        if self.gravity is None or self.widgetToDrop is not None:
+            return
+        if self.updateDepth > 0:
+            self.gravityPending = True
         else:
-            tileNumber, tilesToMerge = self.__getTilesToSplit(direction, fromRow, fromColumn, tileNumber)
-            increase = False
-
-        columnSpan += tileNumber * dirX
-        fromColumn += tileNumber * (dirX == -1)
-        rowSpan += tileNumber * dirY
-        fromRow += tileNumber * (dirY == -1)
+            self.__compact(self.gravity)
+
+    def __rearrangeTiles(self, tiles, areas):
+        """moves the tiles to the areas at once, after a single check of the whole group"""
+        if not self.gridModel.isReplacementPossible(tiles, areas):
+            return False
+
+        with self.batchUpdate():
+            self.__growRows(max((fromRow + rowSpan for fromRow, _, rowSpan, _ in areas), default=0))
+            previousAreas = [(tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan) for tile in tiles]
+            self.gridModel.rearrange(tiles, areas)
+            for tile, previousArea, area in zip(tiles, previousAreas, areas):
+                widget = self.tileRegistry.getWidget(tile)
+                self.__noteEdit(widget, self.id, previousArea, self.id, area)
+                if area[:2] != previousArea[:2]:
+                    self.__notifyTileMoved(widget, self.id, self.id, *previousArea[:2], *area[:2])
+                if area[2:] != previousArea[2:]:
+                    self.__notifyTileResized(widget, *area)
+                # tilesRearranged is held with the other signals, a widget rearranged twice is sent once
+                self.pendingTilesRearranged[widget] = area
+            # the tiles are moved, not created again
+            for tile in tiles:
+                super().removeWidget(tile)
+                super().addWidget(tile, tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan)
+                tile.updateSize()
+                if self.layoutStats is not None:
+                    self.layoutStats.touch()
+        return True
+
+    def __isGroupDropPossible(self, session, row, column):
+        """checks if the dragged group fits with the cursor on the cell (row, column) and highlights where it goes"""
+        rowDelta = row - session.rowOffset - session.fromRow
+        columnDelta = column - session.columnOffset - session.fromColumn
+        tiles = [self.tileRegistry.getTile(widget) for widget in session.group]
+        areas = [
+            (tile.fromRow + rowDelta, tile.fromColumn + columnDelta, tile.rowSpan, tile.columnSpan) for tile in tiles
+        ]
 
-        return tilesToMerge, increase, fromRow, fromColumn, rowSpan, columnSpan
+        self.changeTilesColor('drag_and_drop')
+        if not self.gridModel.isReplacementPossible(tiles, areas):
+            return False
+        for fromRow, fromColumn, rowSpan, columnSpan in areas:
+            self.changeTilesColor('empty_check', (fromRow, fromColumn), (rowSpan, columnSpan))
+        return True
 
-    def __getTilesToSplit(self, direction, fromRow, fromColumn, tileNumber):
-        """finds the tiles to split when a tile is decreased"""
-        tile = self.tileMap[fromRow][fromColumn]
-        rowSpan = tile.getRowSpan()
-        columnSpan = tile.getColumnSpan()
-        (dirX, dirY) = direction
+    def __repaintTile(self, tile):
+        """repaints the background under the tile"""
+        self.background.update(
+            self.background.areaRect(
+                (tile.getFromRow(), tile.getFromColumn()), (tile.getRowSpan(), tile.getColumnSpan())
+            )
+        )
 
-        tileNumber = (
-            tileNumber
-            if -tileNumber * (dirX + dirY) < columnSpan * (dirX != 0) + rowSpan * (dirY != 0)
-            else (1 - columnSpan) * dirX + (1 - rowSpan) * dirY
+    @contextmanager
+    def __recordEdit(self):
+        """records the changes made inside the context as one edit, the compaction following them included"""
+        if self.editChanges is not None:
+            yield
+            return
+
+        self.editChanges = {}
+        try:
+            yield
+        finally:
+            changes, self.editChanges = self.editChanges, None
+        edit = tuple(
+            (widget, fromLayoutId, fromArea, toLayoutId, toArea)
+            for widget, (fromLayoutId, fromArea, toLayoutId, toArea) in changes.items()
+            if (fromLayoutId, fromArea) != (toLayoutId, toArea)
         )
-        tilesToMerge = [
-            (
-                fromRow + row + (rowSpan - 2 * row - 1) * (dirY == 1),
-                fromColumn + column + (columnSpan - 2 * column - 1) * (dirX == 1)
-            )
-            for row in range(-tileNumber * dirY + rowSpan * (dirX != 0))
-            for column in range(-tileNumber * dirX + columnSpan * (dirY != 0))
-        ]
+        if edit:
+            self.editHistory.record(edit)
+
+    def __noteEdit(self, widget, fromLayoutId, fromArea, toLayoutId, toArea):
+        """keeps the change of the widget in the edit being recorded, with its first origin and last destination"""
+        if self.editChanges is None:
+            return
+        if widget in self.editChanges:
+            (fromLayoutId, fromArea, _, _) = self.editChanges[widget]
+        self.editChanges[widget] = (fromLayoutId, fromArea, toLayoutId, toArea)
+
+    def __applyEdit(self, changes):
+        """moves each widget of the (widget, layoutId, area, targetLayoutId, targetArea) changes to its target, once
+        the whole edit is checked on copies of the occupancy indexes"""
+        layouts, occupancyIndexes = {}, {}
+        for _, layoutId, _, targetLayoutId, _ in changes:
+            for someLayoutId in (layoutId, targetLayoutId):
+                if someLayoutId in layouts:
+                    continue
+                if someLayoutId not in self.linkHub.layouts:
+                    return False
+                layouts[someLayoutId] = self.linkHub.getLayout(someLayoutId)
+                occupancyIndexes[someLayoutId] = layouts[someLayoutId].gridModel.occupancyIndex.copy()
+
+        # the widgets must still be where the edit left them
+        departures, moves, arrivals = [], {}, []
+        for widget, layoutId, area, targetLayoutId, targetArea in changes:
+            tileRegistry = layouts[layoutId].tileRegistry
+            if widget not in tileRegistry:
+                return False
+            tile = tileRegistry.getTile(widget)
+            if (tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan) != area:
+                return False
+            if layoutId == targetLayoutId:
+                tiles, previousAreas, areas = moves.setdefault(layoutId, ([], [], []))
+                tiles.append(tile)
+                previousAreas.append(area)
+                areas.append(targetArea)
+            else:
+                departures.append((widget, layoutId, area))
+                arrivals.append((widget, layoutId, area, targetLayoutId, targetArea))
+
+        # the widgets leave their layouts, the others move, then the widgets arrive in their new layouts
+        for _, layoutId, area in departures:
+            occupancyIndexes[layoutId].free(*area)
+        for layoutId, (_, previousAreas, areas) in moves.items():
+            occupancyIndex = occupancyIndexes[layoutId]
+            if not occupancyIndex.isReplacementPossible(previousAreas, areas):
+                return False
+            for area in previousAreas:
+                occupancyIndex.free(*area)
+            for area in areas:
+                occupancyIndex.growRows(area[0] + area[2])
+                occupancyIndex.fill(*area)
+        for _, _, _, targetLayoutId, targetArea in arrivals:
+            occupancyIndex = occupancyIndexes[targetLayoutId]
+            if not occupancyIndex.isAreaInside(*targetArea) or not occupancyIndex.isAreaEmpty(*targetArea):
+                return False
+            occupancyIndex.growRows(targetArea[0] + targetArea[2])
+            occupancyIndex.fill(*targetArea)
+
+        with ExitStack() as stack:
+            for layout in layouts.values():
+                stack.enter_context(layout.batchUpdate())
+            for widget, layoutId, _ in departures:
+                layouts[layoutId].__takeWidget(widget)
+            for layoutId, (tiles, _, areas) in moves.items():
+                layouts[layoutId].__rearrangeTiles(tiles, areas)
+            for widget, layoutId, area, targetLayoutId, targetArea in arrivals:
+                layouts[targetLayoutId].__placeWidget(widget, *targetArea)
+                layouts[targetLayoutId].__notifyTileMoved(
+                    widget, layoutId, targetLayoutId, area[0], area[1], targetArea[0], targetArea[1]
+                )
+        return True
 
-        return tileNumber, tilesToMerge
+    def __notifyTileMoved(self, widget, fromLayoutId, toLayoutId, fromRow, fromColumn, toRow, toColumn):
+        """emits tileMoved, or keeps it until the end of the batch with the first origin and the last destination"""
+        if self.updateDepth == 0:
+            self.tileMoved.emit(widget, fromLayoutId, toLayoutId, fromRow, fromColumn, toRow, toColumn)
+            return
 
-    def __getTilesToMerge(self, direction, fromRow, fromColumn, tileNumber):
-        """finds the tiles to merge when a tile is increased"""
-        tile = self.tileMap[fromRow][fromColumn]
-        rowSpan = tile.getRowSpan()
-        columnSpan = tile.getColumnSpan()
-        tileNumberAvailable = 0
-        tilesToMerge = []
-        (dirX, dirY) = direction
-
-        tileNumber = (
-            max(tileNumber, -fromColumn * (dirX != 0) - fromRow * (dirY != 0))
-            if (dirX + dirY == -1)
-            else min(
-                tileNumber,
-                ((self.columnNumber - fromColumn - columnSpan) * (dirX != 0)
-                 + (self.rowNumber - fromRow - rowSpan) * (dirY != 0))
+        if widget in self.pendingTileMoved:
+            (_, fromLayoutId, _, fromRow, fromColumn, _, _) = self.pendingTileMoved[widget]
+        self.pendingTileMoved[widget] = (widget, fromLayoutId, toLayoutId, fromRow, fromColumn, toRow, toColumn)
+
+    def __notifyTileResized(self, widget, fromRow, fromColumn, rowSpan, columnSpan):
+        """emits tileResized, or keeps the last one of each widget until the end of the batch"""
+        if self.updateDepth == 0:
+            self.tileResized.emit(widget, fromRow, fromColumn, rowSpan, columnSpan)
+        else:
+            self.pendingTileResized[widget] = (widget, fromRow, fromColumn, rowSpan, columnSpan)
+
+    def __mergeTiles(self, tile, area, cells):
+        """merges the empty cells with tile"""
+        previousArea = (tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan)
+        self.gridModel.merge(tile, area, cells)
+        self.__applyTileArea(tile, previousArea)
+
+    def __splitTiles(self, tile, area, cells):
+        """splits the cells from tile"""
+        previousArea = (tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan)
+        self.gridModel.split(tile, area, cells)
+        self.__applyTileArea(tile, previousArea)
+
+    def __applyTileArea(self, tile, previousArea):
+        """puts the tile on the area the grid model gave it"""
+        area = (tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan)
+        self.__noteEdit(self.tileRegistry.getWidget(tile), self.id, previousArea, self.id, area)
+        super().removeWidget(tile)
+        super().addWidget(tile, tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan)
+        tile.updateSize()
+        if self.layoutStats is not None:
+            self.layoutStats.touch()
+
+    def __createTile(self, fromRow, fromColumn, rowSpan=1, columnSpan=1):
+        """creates a tile: a tile is the place holder of a widget, empty cells have no tile"""
+        if self.tilePool:
+            tile = self.tilePool.pop()
+            tile.updateSize(fromRow, fromColumn, rowSpan, columnSpan, self.verticalSpan, self.horizontalSpan)
+            tile.setVisible(True)
+        else:
+            tile = Tile(
+                self,
+                fromRow,
+                fromColumn,
+                rowSpan,
+                columnSpan,
+                self.verticalSpan,
+                self.horizontalSpan,
             )
-        )
+        super().addWidget(tile, fromRow, fromColumn, rowSpan, columnSpan)
+        if self.layoutStats is not None:
+            self.layoutStats.touch()
 
-        # west or east
-        if dirX != 0:
-            for column in range(tileNumber * dirX):
-                tilesToCheck = []
-                columnDelta = (columnSpan + column) * (dirX == 1) + (-column - 1) * (dirX == -1)
-                for row in range(rowSpan):
-                    tilesToCheck.append((fromRow + row, fromColumn + columnDelta))
-                    if self.tileMap[fromRow + row][fromColumn + columnDelta].isFilled():
-                        return tileNumberAvailable, self.__flattenList(tilesToMerge)
-                tileNumberAvailable += dirX
-                tilesToMerge.append(tilesToCheck)
-
-        # north or south
+        return tile
+
+    def __releaseTile(self, tile):
+        """takes the tile out of the grid, a tile being dragged is only pooled at the end of its drag"""
+        self.mouseDispatcher.forget(tile)
+        super().removeWidget(tile)
+        if self.layoutStats is not None:
+            self.layoutStats.touch()
+        if not tile.dragInProcess:
+            self.__poolTile(tile)
+
+    def __poolTile(self, tile):
+        """hides the tile to reuse it later, or deletes it if the pool is full"""
+        # the removed widget must not follow the tile, it may be added again or outlive a deleted tile
+        tile.clear()
+        if len(self.tilePool) < self.tilePoolSize:
+            tile.setVisible(False)
+            self.tilePool.append(tile)
         else:
-            for row in range(tileNumber * dirY):
-                tilesToCheck = []
-                rowDelta = (rowSpan + row) * (dirY == 1) + (-row - 1) * (dirY == -1)
-                for column in range(columnSpan):
-                    tilesToCheck.append((fromRow + rowDelta, fromColumn + column))
-                    if self.tileMap[fromRow + rowDelta][fromColumn + column].isFilled():
-                        return tileNumberAvailable, self.__flattenList(tilesToMerge)
-                tileNumberAvailable += dirY
-                tilesToMerge.append(tilesToCheck)
-
-        return tileNumberAvailable, self.__flattenList(tilesToMerge)
-
-    def __createTileMap(self):
-        """Creates a map to be able to locate each tile on the grid"""
-        for row in range(self.rowNumber):
-            self.tileMap.append([])
-            for column in range(self.columnNumber):
-                tile = self.__createTile(row, column)
-                self.tileMap[-1].append(tile)
+            tile.deleteLater()
 
+    def __createGrid(self):
+        """Sets up the rows and the columns of the grid, the grid model locates the tiles"""
+        for row in range(self.rowNumber):
+            self.setRowMinimumHeight(row, self.verticalSpan)
+        for column in range(self.columnNumber):
+            self.setColumnMinimumWidth(column, self.horizontalSpan)
+        self.__updateBackground()
+
+    def __updateBackground(self):
+        """Makes the background span the whole grid, it gives its geometry to the empty cells"""
+        super().removeWidget(self.background)
+        super().addWidget(self.background, 0, 0, self.rowNumber, self.columnNumber)
+        self.background.lower()
+        self.background.update()
+
+    @measured('updateAllTiles')
     def __updateAllTiles(self):
         """Forces the tiles to update their geometry"""
+        self.rowPitch = self.verticalSpan + self.verticalSpacing()
+        self.columnPitch = self.horizontalSpan + self.horizontalSpacing()
         for row in range(self.rowNumber):
-            for column in range(self.columnNumber):
-                self.tileMap[row][column].updateSize(
-                    verticalSpan=self.verticalSpan,
-                    horizontalSpan=self.horizontalSpan
-                )
-
-    @staticmethod
-    def __flattenList(toFlatten):
-        """returns a 1D list given a 2D list"""
-        return [item for aList in toFlatten for item in aList]
+            self.setRowMinimumHeight(row, self.verticalSpan)
+        for column in range(self.columnNumber):
+            self.setColumnMinimumWidth(column, self.horizontalSpan)
+
+        # merged tiles appear once per cell in the tile map but only once in the registry
+        for tile in self.tileRegistry.tileList():
+            tile.updateSize(
+                verticalSpan=self.verticalSpan,
+                horizontalSpan=self.horizontalSpan
+            )
+        if self.layoutStats is not None:
+            self.layoutStats.touch(len(self.tileRegistry))
+        self.background.update()
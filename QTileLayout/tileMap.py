@@ -0,0 +1,74 @@
+class TileMap:
+    """
+    Locates the tile covering each cell of a tileLayout: only the rows holding a tile are stored, the other ones
+    share a read-only empty row
+    """
+
+    def __init__(self, rowNumber, columnNumber):
+        self.rowNumber = rowNumber
+        self.columnNumber = columnNumber
+        self.rows = {}
+        # number of filled cells of each stored row, a row is dropped when it has none left
+        self.counts = {}
+        self.emptyRow = (None,) * columnNumber
+
+    def __getitem__(self, row):
+        """returns the tiles of the row, it must not be modified"""
+        return self.rows.get(row, self.emptyRow)
+
+    def __len__(self):
+        return self.rowNumber
+
+    def set(self, row, column, tile):
+        """puts the tile, or None, in the cell (row, column)"""
+        cells = self.rows.get(row)
+        if cells is None:
+            if tile is None:
+                return
+            cells = self.rows[row] = [None] * self.columnNumber
+            self.counts[row] = 0
+
+        self.counts[row] += (tile is not None) - (cells[column] is not None)
+        cells[column] = tile
+        if not self.counts[row]:
+            del self.rows[row]
+            del self.counts[row]
+
+    def fill(self, tile, fromRow, fromColumn, rowSpan, columnSpan):
+        """puts the tile, or None, in every cell of the area"""
+        filled = columnSpan if tile is not None else 0
+        for row in range(fromRow, fromRow + rowSpan):
+            cells = self.rows.get(row)
+            if cells is None:
+                if tile is None:
+                    continue
+                cells = self.rows[row] = [None] * self.columnNumber
+                self.counts[row] = 0
+
+            self.counts[row] += filled - columnSpan + cells[fromColumn:fromColumn + columnSpan].count(None)
+            cells[fromColumn:fromColumn + columnSpan] = [tile] * columnSpan
+            if not self.counts[row]:
+                del self.rows[row]
+                del self.counts[row]
+
+    def addRows(self, rowNumber):
+        """adds empty rows at the bottom, nothing is stored for them"""
+        self.rowNumber += rowNumber
+
+    def addColumns(self, columnNumber):
+        """adds empty columns at the right"""
+        self.columnNumber += columnNumber
+        self.emptyRow = (None,) * self.columnNumber
+        for cells in self.rows.values():
+            cells.extend([None] * columnNumber)
+
+    def removeRows(self, rowNumber):
+        """removes empty rows from the bottom"""
+        self.rowNumber -= rowNumber
+
+    def removeColumns(self, columnNumber):
+        """removes empty columns from the right"""
+        self.columnNumber -= columnNumber
+        self.emptyRow = (None,) * self.columnNumber
+        for cells in self.rows.values():
+            del cells[self.columnNumber:]
@@ -0,0 +1,20 @@
+class TileRecord:
+    """
+    The place of a tile in a grid model, without Qt: key is the object the record stands for
+    """
+
+    __slots__ = ('fromRow', 'fromColumn', 'rowSpan', 'columnSpan', 'key')
+
+    def __init__(self, fromRow, fromColumn, rowSpan=1, columnSpan=1, key=None):
+        self.fromRow = fromRow
+        self.fromColumn = fromColumn
+        self.rowSpan = rowSpan
+        self.columnSpan = columnSpan
+        self.key = key
+
+    def __repr__(self):
+        return f'TileRecord({self.fromRow}, {self.fromColumn}, {self.rowSpan}, {self.columnSpan}, {self.key!r})'
+
+    def area(self):
+        """returns the (fromRow, fromColumn, rowSpan, columnSpan) of the tile"""
+        return self.fromRow, self.fromColumn, self.rowSpan, self.columnSpan
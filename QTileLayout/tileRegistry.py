@@ -0,0 +1,45 @@
+class TileRegistry:
+    """
+    Keeps the couples (widget, tile) of a tileLayout: each one is found from the other in constant time
+    """
+
+    def __init__(self):
+        self.tiles = {}
+        self.widgets = {}
+
+    def __contains__(self, widget):
+        return widget in self.tiles
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def add(self, widget, tile):
+        """registers the couple (widget, tile)"""
+        self.tiles[widget] = tile
+        self.widgets[tile] = widget
+
+    def remove(self, widget):
+        """unregisters the widget and returns its tile"""
+        tile = self.tiles.pop(widget)
+        self.widgets.pop(tile)
+        return tile
+
+    def getTile(self, widget):
+        """returns the tile holding the widget"""
+        return self.tiles[widget]
+
+    def getWidget(self, tile):
+        """returns the widget held by the tile"""
+        return self.widgets[tile]
+
+    def widgetList(self):
+        """returns a read-only view of the widgets, in insertion order"""
+        return self.tiles.keys()
+
+    def tileList(self):
+        """returns a read-only view of the tiles, in insertion order"""
+        return self.tiles.values()
+
+    def couples(self):
+        """returns a read-only view of the couples (widget, tile), in insertion order"""
+        return self.tiles.items()
@@ -0,0 +1,39 @@
+class WidgetCache:
+    """
+    Keeps the widgets built by the lazy widgets of a tileLayout: beyond its size, the least recently shown ones that
+    are out of view are destroyed, they are built again when they come back in view
+    """
+
+    def __init__(self, size=None):
+        self.size = size
+        # dictionaries keep the insertion order, the least recently shown lazy widget comes first
+        self.lazyWidgets = {}
+
+    def __len__(self):
+        return len(self.lazyWidgets)
+
+    def use(self, lazyWidget):
+        """marks the lazy widget as the most recently shown one and destroys the widgets in excess"""
+        self.touch(lazyWidget)
+        self.trim()
+
+    def touch(self, lazyWidget):
+        """marks the lazy widget as the most recently shown one"""
+        self.lazyWidgets.pop(lazyWidget, None)
+        self.lazyWidgets[lazyWidget] = None
+
+    def discard(self, lazyWidget):
+        """forgets the lazy widget"""
+        self.lazyWidgets.pop(lazyWidget, None)
+
+    def trim(self):
+        """destroys the least recently shown widgets beyond the size, the ones in view are kept"""
+        if self.size is None:
+            return
+        excess = len(self.lazyWidgets) - self.size
+        for lazyWidget in list(self.lazyWidgets):
+            if excess <= 0:
+                break
+            if lazyWidget.visibleRegion().isEmpty():
+                lazyWidget.release()
+                excess -= 1
@@ -0,0 +1,437 @@
+"""
+Headless benchmarks of the tile layout operations
+
+    python benchmark.py --output results.json
+    python benchmark.py --compare results.json --tolerance 0.25
+
+The results are written as json: for each benchmark, the timings of the runs (in seconds), the peak of the python
+allocations and the resident memory growth (in bytes). In compare mode, the script exits with an error if a benchmark
+median time is slower than the baseline one by more than the tolerance.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5 import QtWidgets, QtCore, QtGui
+from PyQt5.QtCore import Qt
+
+from QTileLayout import QTileLayout
+from QTileLayout.dragSession import DragSession, TileMimeData
+from QTileLayout.gridModel import GridModel
+from QTileLayout.tileRecord import TileRecord
+
+
+def residentMemory():
+    """returns the resident memory of the process in bytes, or 0 if it is unknown"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def processEvents():
+    """lets Qt run the pending layout requests, paints and deferred deletions"""
+    app = QtWidgets.QApplication.instance()
+    # showing new widgets queues more events, a few rounds are needed for the application to be idle
+    for _ in range(3):
+        app.processEvents()
+        app.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+
+
+def createLayout(row_number, column_number, span=10, spacing=1):
+    """creates a tile layout in a shown widget"""
+    widget = QtWidgets.QWidget()
+    tile_layout = QTileLayout(row_number, column_number, span, span, spacing, spacing)
+    widget.setLayout(tile_layout)
+    widget.show()
+    return widget, tile_layout
+
+
+def fillLayout(tile_layout, row_number, column_number):
+    """puts one label on each cell of the area"""
+    labels = [QtWidgets.QLabel() for _ in range(row_number * column_number)]
+    tile_layout.addWidgets([
+        (label, index // column_number, index % column_number) for index, label in enumerate(labels)
+    ])
+    return labels
+
+
+def measure(name, setup, run, repeat):
+    """times run(setup()) repeat times, then measures the memory used by one more run"""
+    timings = []
+    for _ in range(repeat + 1):
+        context = setup()
+        processEvents()
+        gc.collect()
+
+        # the last run is traced, which would slow down the timed ones
+        if len(timings) == repeat:
+            tracemalloc.start()
+            resident = residentMemory()
+            run(context)
+            processEvents()
+            python_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            resident_growth = max(residentMemory() - resident, 0)
+        else:
+            start = time.perf_counter()
+            run(context)
+            processEvents()
+            timings.append(time.perf_counter() - start)
+
+        del context
+        processEvents()
+
+    result = {
+        'timings': timings,
+        'median': statistics.median(timings),
+        'min': min(timings),
+        'python_peak': python_peak,
+        'resident_growth': resident_growth,
+    }
+    print(f'{name:<40} median {result["median"] * 1000:9.3f} ms   min {result["min"] * 1000:9.3f} ms   '
+          f'python peak {python_peak / 1024:9.1f} KiB')
+    return result
+
+
+def benchConstruction(grid_size):
+    """constructs an empty layout"""
+    return (lambda: None), (lambda context: createLayout(grid_size, grid_size))
+
+
+def benchAddWidget(grid_size):
+    """adds one widget per cell, one call at a time"""
+    def setup():
+        widget, tile_layout = createLayout(grid_size, grid_size)
+        return widget, tile_layout, [QtWidgets.QLabel() for _ in range(grid_size * grid_size)]
+
+    def run(context):
+        widget, tile_layout, labels = context
+        for index, label in enumerate(labels):
+            tile_layout.addWidget(label, index // grid_size, index % grid_size)
+    return setup, run
+
+
+def benchAddWidgets(grid_size):
+    """adds one widget per cell in one batch"""
+    def setup():
+        widget, tile_layout = createLayout(grid_size, grid_size)
+        return widget, tile_layout, [QtWidgets.QLabel() for _ in range(grid_size * grid_size)]
+
+    def run(context):
+        widget, tile_layout, labels = context
+        tile_layout.addWidgets([(label, index // grid_size, index % grid_size) for index, label in enumerate(labels)])
+    return setup, run
+
+
+def benchRemoveWidget(grid_size):
+    """removes every widget of a full layout"""
+    def setup():
+        widget, tile_layout = createLayout(grid_size, grid_size)
+        return widget, tile_layout, fillLayout(tile_layout, grid_size, grid_size)
+
+    def run(context):
+        widget, tile_layout, labels = context
+        for label in labels:
+            tile_layout.removeWidget(label)
+    return setup, run
+
+
+def benchResizeTile(grid_size):
+    """grows and shrinks a tile in the four directions on a half full layout"""
+    def setup():
+        widget, tile_layout = createLayout(grid_size, grid_size)
+        fillLayout(tile_layout, grid_size // 4, grid_size)
+        tile_layout.addWidget(QtWidgets.QLabel(), grid_size // 2, grid_size // 2)
+        return widget, tile_layout
+
+    def run(context):
+        widget, tile_layout = context
+        middle = grid_size // 2
+        for _ in range(10):
+            tile_layout.resizeTile((1, 0), middle, middle, grid_size)
+            tile_layout.resizeTile((1, 0), middle, middle, -grid_size)
+            tile_layout.resizeTile((0, 1), middle, middle, grid_size)
+            tile_layout.resizeTile((0, 1), middle, middle, -grid_size)
+            tile_layout.resizeTile((-1, 0), middle, middle, -grid_size)
+            tile_layout.resizeTile((-1, 0), middle, 0, grid_size)
+    return setup, run
+
+
+def benchIsAreaEmpty(grid_size):
+    """checks every 4x4 area of a half full layout"""
+    def setup():
+        widget, tile_layout = createLayout(grid_size, grid_size)
+        fillLayout(tile_layout, grid_size // 2, grid_size)
+        return widget, tile_layout
+
+    def run(context):
+        widget, tile_layout = context
+        for row in range(grid_size - 3):
+            for column in range(grid_size - 3):
+                tile_layout.isAreaEmpty(row, column, 4, 4)
+    return setup, run
+
+
+def benchChangeTilesColor(grid_size):
+    """repeats the color changes of a drag hovering the grid"""
+    def setup():
+        widget, tile_layout = createLayout(grid_size, grid_size)
+        fillLayout(tile_layout, grid_size // 2, grid_size)
+        return widget, tile_layout
+
+    def run(context):
+        widget, tile_layout = context
+        for column in range(grid_size - 1):
+            tile_layout.changeTilesColor('drag_and_drop')
+            tile_layout.changeTilesColor('empty_check', (grid_size - 2, column), (2, 2))
+        tile_layout.changeTilesColor('idle')
+    return setup, run
+
+
+def benchBackgroundPaint(grid_size):
+    """repaints 10 times the whole background of a half full grid with a drag highlight"""
+    def setup():
+        widget, tile_layout = createLayout(grid_size, grid_size)
+        fillLayout(tile_layout, grid_size // 2, grid_size // 2)
+        tile_layout.changeTilesColor('drag_and_drop')
+        tile_layout.changeTilesColor('empty_check', (grid_size // 4, grid_size // 4), (grid_size // 2, grid_size // 2))
+        image = QtGui.QImage(tile_layout.background.size(), QtGui.QImage.Format_ARGB32)
+        return widget, tile_layout, image
+
+    def run(context):
+        widget, tile_layout, image = context
+        for _ in range(10):
+            tile_layout.background.render(image)
+    return setup, run
+
+
+def benchUpdateGlobalSize(grid_size):
+    """fits a full layout to 20 different sizes"""
+    def setup():
+        widget, tile_layout = createLayout(grid_size, grid_size)
+        fillLayout(tile_layout, grid_size, grid_size)
+        return widget, tile_layout
+
+    def run(context):
+        widget, tile_layout = context
+        for step in range(20):
+            size = QtCore.QSize(grid_size * (12 + step), grid_size * (12 + step))
+            tile_layout.updateGlobalSize(QtGui.QResizeEvent(size, size))
+    return setup, run
+
+
+def benchRowsAndColumns(grid_size):
+    """adds and removes rows and columns around a half full layout"""
+    def setup():
+        widget, tile_layout = createLayout(grid_size, grid_size)
+        fillLayout(tile_layout, grid_size // 2, grid_size // 2)
+        return widget, tile_layout
+
+    def run(context):
+        widget, tile_layout = context
+        for _ in range(10):
+            tile_layout.addRows(grid_size)
+            tile_layout.addColumns(grid_size)
+            tile_layout.removeRows(grid_size)
+            tile_layout.removeColumns(grid_size)
+    return setup, run
+
+
+def benchUnboundedRows(grid_size):
+    """appends widgets to an unbounded layout, the rows are added as the widgets arrive"""
+    def setup():
+        widget, tile_layout = createLayout(1, grid_size)
+        tile_layout.setUnboundedRows(True)
+        labels = [QtWidgets.QLabel() for _ in range(grid_size * grid_size)]
+        return widget, tile_layout, labels
+
+    def run(context):
+        widget, tile_layout, labels = context
+        for label in labels:
+            tile_layout.autoPlace(label)
+    return setup, run
+
+
+def benchPointerMoves(grid_size):
+    """moves the pointer without button across every widget of a full layout, as hovering does"""
+    def setup():
+        widget, tile_layout = createLayout(grid_size, grid_size, span=20)
+        labels = fillLayout(tile_layout, grid_size, grid_size)
+        widget.show()
+        QtWidgets.QApplication.instance().processEvents()
+        return widget, tile_layout, labels
+
+    def run(context):
+        widget, tile_layout, labels = context
+        app = QtWidgets.QApplication.instance()
+        for label in labels:
+            for x in range(0, 20, 2):
+                app.sendEvent(label, QtGui.QMouseEvent(
+                    QtCore.QEvent.MouseMove, QtCore.QPointF(x, 10), Qt.NoButton, Qt.NoButton, Qt.NoModifier
+                ))
+    return setup, run
+
+
+def benchUndoRedo(grid_size):
+    """moves each widget of a half filled layout, then undoes and redoes all the moves"""
+    def setup():
+        widget, tile_layout = createLayout(grid_size, grid_size)
+        labels = fillLayout(tile_layout, grid_size // 2, grid_size)
+        tile_layout.setHistoryDepth(len(labels))
+        return widget, tile_layout, labels
+
+    def run(context):
+        widget, tile_layout, labels = context
+        for label in reversed(labels):
+            tile_layout.moveWidgets([label], grid_size // 2, 0)
+        while tile_layout.undo():
+            pass
+        while tile_layout.redo():
+            pass
+    return setup, run
+
+
+def benchGridModel(grid_size):
+    """places, resizes and compacts tile records in a grid model, without Qt"""
+    def setup():
+        return None
+
+    def run(context):
+        grid_model = GridModel(grid_size, grid_size)
+        for row in range(0, grid_size, 2):
+            for column in range(0, grid_size, 2):
+                grid_model.place(TileRecord(row, column))
+        for row in range(0, grid_size, 2):
+            cells, increase, area = grid_model.getResizePlan((1, 0), row, 0, 1)
+            grid_model.merge(grid_model.tileAt(row, 0), area, cells)
+        grid_model.rearrange(*grid_model.getCompactPlan((0, -1)))
+    return setup, run
+
+
+def benchDragAndDrop(grid_size):
+    """moves widgets between two linked layouts with synthesized drag and drop events"""
+    def setup():
+        widget_1, tile_layout_1 = createLayout(grid_size, grid_size, span=20)
+        widget_2, tile_layout_2 = createLayout(grid_size, grid_size, span=20)
+        tile_layout_1.linkLayout(tile_layout_2)
+        labels = fillLayout(tile_layout_1, grid_size // 2, grid_size)
+        return widget_1, tile_layout_1, widget_2, tile_layout_2, labels[:grid_size]
+
+    def run(context):
+        widget_1, tile_layout_1, widget_2, tile_layout_2, labels = context
+        app = QtWidgets.QApplication.instance()
+        step = tile_layout_2.verticalSpan + tile_layout_2.verticalSpacing()
+
+        for column, label in enumerate(labels):
+            session = DragSession(tile_layout_1.id, 0, column, 1, 1, 0, 0, label)
+            mime_data = TileMimeData(session)
+            tile_layout_1.setWidgetToDrop(label)
+            tile_layout_1.removeWidget(label)
+            tile_layout_1.linkHub.beginDrag(tile_layout_1, session)
+
+            # hover the whole target row before dropping on the last cell of the path
+            target = tile_layout_2.background
+            app.sendEvent(target, QtGui.QDragEnterEvent(
+                QtCore.QPoint(1, 1), Qt.MoveAction, mime_data, Qt.LeftButton, Qt.NoModifier
+            ))
+            for hovered in range(column + 1):
+                position = QtCore.QPoint(hovered * step + 1, grid_size // 2 * step + 1)
+                app.sendEvent(target, QtGui.QDragMoveEvent(
+                    position, Qt.MoveAction, mime_data, Qt.LeftButton, Qt.NoModifier
+                ))
+            app.sendEvent(target, QtGui.QDropEvent(
+                QtCore.QPointF(position), Qt.MoveAction, mime_data, Qt.LeftButton, Qt.NoModifier
+            ))
+            tile_layout_1.linkHub.endDrag()
+    return setup, run
+
+
+BENCHMARKS = [
+    ('construction', benchConstruction, (10, 50, 200)),
+    ('addWidget', benchAddWidget, (10, 40)),
+    ('addWidgets', benchAddWidgets, (10, 40)),
+    ('removeWidget', benchRemoveWidget, (10, 40)),
+    ('resizeTile', benchResizeTile, (20, 80)),
+    ('isAreaEmpty', benchIsAreaEmpty, (20, 80)),
+    ('changeTilesColor', benchChangeTilesColor, (20, 80)),
+    ('backgroundPaint', benchBackgroundPaint, (50, 200)),
+    ('updateGlobalSize', benchUpdateGlobalSize, (10, 40)),
+    ('rowsAndColumns', benchRowsAndColumns, (20, 80)),
+    ('unboundedRows', benchUnboundedRows, (10, 30)),
+    ('pointerMoves', benchPointerMoves, (10, 30)),
+    ('undoRedo', benchUndoRedo, (10, 30)),
+    ('gridModel', benchGridModel, (20, 80)),
+    ('dragAndDrop', benchDragAndDrop, (10, 30)),
+]
+
+
+def runBenchmarks(selection, repeat):
+    """runs the selected benchmarks and returns their results"""
+    results = {}
+    for name, benchmark, grid_sizes in BENCHMARKS:
+        if selection and name not in selection:
+            continue
+        for grid_size in grid_sizes:
+            setup, run = benchmark(grid_size)
+            key = f'{name}[{grid_size}x{grid_size}]'
+            results[key] = measure(key, setup, run, repeat)
+    return results
+
+
+def compareResults(results, baseline, tolerance):
+    """prints the time ratio of each benchmark against the baseline and returns the regressed ones"""
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            print(f'{key:<40} not in the baseline')
+            continue
+        ratio = result['median'] / baseline[key]['median']
+        status = 'REGRESSION' if ratio > 1 + tolerance else 'ok'
+        print(f'{key:<40} {ratio:7.2f}x   {status}')
+        if status != 'ok':
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('benchmarks', nargs='*', help='names of the benchmarks to run, all of them by default')
+    parser.add_argument('--repeat', type=int, default=5, help='number of runs of each benchmark')
+    parser.add_argument('--output', help='json file where the results are written')
+    parser.add_argument('--compare', help='json file of baseline results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown ratio in compare mode')
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication(sys.argv)
+    results = runBenchmarks(args.benchmarks, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({
+                'python': platform.python_version(),
+                'qt': QtCore.QT_VERSION_STR,
+                'platform': app.platformName(),
+                'results': results,
+            }, output, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            regressions = compareResults(results, json.load(baseline)['results'], args.tolerance)
+        if regressions:
+            print(f'{len(regressions)} benchmark(s) slower than the baseline')
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Checks that the grid model works without Qt, as it does in a headless process or a worker thread
+
+    python checkGridModel.py
+
+PyQt5 is made unimportable and the package __init__, which imports the layout, is skipped: only the grid model
+modules are loaded. The script exits with an error if a check fails.
+"""
+import os
+import sys
+import threading
+import types
+
+# any import of Qt by the grid model fails
+sys.modules['PyQt5'] = None
+package = types.ModuleType('QTileLayout')
+package.__path__ = [os.path.join(os.path.dirname(os.path.abspath(__file__)), 'QTileLayout')]
+sys.modules['QTileLayout'] = package
+
+from QTileLayout.gridModel import GridModel
+from QTileLayout.tileRecord import TileRecord
+
+
+def areaOf(tile):
+    """returns the (fromRow, fromColumn, rowSpan, columnSpan) of the tile"""
+    return tile.fromRow, tile.fromColumn, tile.rowSpan, tile.columnSpan
+
+
+def checkPlace():
+    """places and removes tiles"""
+    grid_model = GridModel(4, 4)
+    tile = TileRecord(1, 1, 2, 2, 'a')
+    assert grid_model.isAreaEmpty(1, 1, 2, 2)
+    grid_model.place(tile)
+    assert grid_model.tileAt(2, 2) is tile and not grid_model.isAreaEmpty(0, 0, 2, 2)
+    assert grid_model.getTilesInArea(0, 0, 4, 4) == [tile]
+    grid_model.remove(tile)
+    assert len(grid_model) == 0 and grid_model.isAreaEmpty(0, 0, 4, 4)
+
+
+def checkMove():
+    """moves two tiles at once, each one to the place of the other"""
+    grid_model = GridModel(2, 2)
+    first, second = TileRecord(0, 0, key='a'), TileRecord(0, 1, key='b')
+    grid_model.place(first)
+    grid_model.place(second)
+    areas = [(0, 1, 1, 1), (0, 0, 1, 1)]
+    assert grid_model.isReplacementPossible([first, second], areas)
+    assert not grid_model.isReplacementPossible([first], areas[:1])
+    grid_model.rearrange([first, second], areas)
+    assert grid_model.tileAt(0, 1) is first and grid_model.tileAt(0, 0) is second
+
+
+def checkResize():
+    """grows a tile over the empty cells on its right, then shrinks it back"""
+    grid_model = GridModel(3, 3)
+    tile = TileRecord(0, 0, key='a')
+    grid_model.place(tile)
+    cells, increase, area = grid_model.getResizePlan((1, 0), 0, 0, 2)
+    assert increase and area == (0, 0, 1, 3)
+    grid_model.merge(tile, area, cells)
+    assert areaOf(tile) == (0, 0, 1, 3) and grid_model.tileAt(0, 2) is tile
+    cells, increase, area = grid_model.getResizePlan((1, 0), 0, 0, -2)
+    assert not increase and area == (0, 0, 1, 1)
+    grid_model.split(tile, area, cells)
+    assert areaOf(tile) == (0, 0, 1, 1) and grid_model.isAreaEmpty(0, 1, 1, 2)
+
+
+def checkCompact():
+    """compacts the tiles to the top"""
+    grid_model = GridModel(4, 2)
+    tiles = [TileRecord(3, 0, key='a'), TileRecord(1, 1, 2, 1, 'b')]
+    for tile in tiles:
+        grid_model.place(tile)
+    grid_model.rearrange(*grid_model.getCompactPlan((0, -1)))
+    assert [areaOf(tile) for tile in tiles] == [(0, 0, 1, 1), (0, 1, 2, 1)]
+    assert grid_model.getCompactPlan((0, -1)) == ([], [])
+
+
+def checkWorkerThread():
+    """plans a compaction on a copy of the model in a worker thread"""
+    grid_model = GridModel(20, 20)
+    for index in range(0, 400, 3):
+        grid_model.place(TileRecord(index // 20, index % 20, key=index))
+    copy = grid_model.copy()
+    results = []
+    worker = threading.Thread(target=lambda: results.append(copy.getCompactPlan((-1, 0))))
+    worker.start()
+    worker.join()
+    tiles, areas = results[0]
+    keys = {tile.key for tile in grid_model.tiles}
+    assert tiles and all(tile.key in keys for tile in tiles)
+    copy.rearrange(tiles, areas)
+    assert len(copy) == len(grid_model)
+
+
+CHECKS = [checkPlace, checkMove, checkResize, checkCompact, checkWorkerThread]
+
+
+def main():
+    for check in CHECKS:
+        check()
+        print(f'{check.__name__:<40} ok')
+    assert not any(name.startswith('PyQt5.') for name in sys.modules)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
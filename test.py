@@ -187,7 +187,8 @@ class MainWindow(QtWidgets.QMainWindow):
             self.scroll.setContentsMargins(0, 0, 0, 0)
             self.scroll.setWidget(self.central_widget)
             self.setCentralWidget(self.scroll)
-            self.scroll.resizeEvent = self.__centralWidgetResize
+            # fit the tiles to the scroll area size, resize events are coalesced to one update per frame
+            self.tile_layout.setResizeSource(self.scroll, frameBudget=16)
 
             # if you are not in static layout mode, think to change the scrollArea minimum height and width if you
             # change tiles minimum height or width
@@ -226,9 +227,6 @@ class MainWindow(QtWidgets.QMainWindow):
     def __tileHasBeenMoved(widget, from_layout_id, to_layout_id, from_row, from_column, to_row, to_column):
         print(f'{widget} has been moved from position ({from_row}, {from_column}) to ({to_row}, {to_column})')
 
-    def __centralWidgetResize(self, a0):
-        self.tile_layout.updateGlobalSize(a0)
-
 
 if __name__ == "__main__":
     app = QtWidgets.QApplication(sys.argv)